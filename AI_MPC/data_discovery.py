@@ -1,49 +1,74 @@
 #%% Import libraries
 import pandas as pd
+import numpy as np
 import os
+import logging
+import importlib.util
+from functools import lru_cache
 from typing import Dict, List, Any, Optional
 
+logger = logging.getLogger(__name__)
+
+# Parquet sidecars need pyarrow; without it every load goes through the CSV parser
+_HAS_PARQUET = importlib.util.find_spec('pyarrow') is not None
+
+# Aggregate tickers in the data files
+_SECTOR_SET = frozenset({'Sector', 'SOCB', 'Private_1', 'Private_2', 'Private_3'})
+_SUB_SECTOR_SET = frozenset({'SOCB', 'Private_1', 'Private_2', 'Private_3'})
+
+@lru_cache(maxsize=1)
+def _read_latest_quarter(data_dir: str) -> str:
+    """Read the latest quarter for a data directory once per process"""
+    try:
+        quarter_file = os.path.join(data_dir, 'dfsectorquarter.csv')
+        if os.path.exists(quarter_file):
+            df = pd.read_csv(quarter_file, usecols=lambda c: c == 'Date_Quarter')
+            if 'Date_Quarter' in df.columns:
+                quarters = pd.Series(df['Date_Quarter'].unique())
+                if quarters.empty:
+                    return "2025-Q2"
+                # Vectorized _quarter_to_numeric (unparseable -> 0); stable sort keeps ties in file order
+                q = pd.to_numeric(quarters.str[0], errors='coerce')
+                year = 2000 + pd.to_numeric(quarters.str[2:4], errors='coerce')
+                keys = (year + (q - 1) / 4).fillna(0).to_numpy()
+                return quarters.iloc[np.argsort(keys, kind='stable')[-1]]
+        return "2025-Q2"
+    except:
+        return "2025-Q2"
+
+@lru_cache(maxsize=1)
+def _latest_4_quarters(latest_quarter: str) -> tuple:
+    """Latest 4 quarters ending at latest_quarter, oldest first"""
+    try:
+        q = int(latest_quarter[0])
+        year = int(latest_quarter[2:4])
+        
+        raw_q = q - np.arange(3, -1, -1)
+        calc_q = (raw_q - 1) % 4 + 1
+        calc_year = year + (raw_q - 1) // 4
+        
+        return tuple(f"{cq}Q{cy:02d}" for cq, cy in zip(calc_q, calc_year))
+    except:
+        return ("2024-Q3", "2024-Q4", "2025-Q1", "2025-Q2")
+
 class DataDiscoveryAgent:
     
     def __init__(self, data_dir: str = 'Data'):
         self.data_dir = data_dir
-        self.data_cache = {}
+        # Filter-ready frames per (filepath, columns); bounded, since every keycode set is a new entry
+        self._frame_memo = lru_cache(maxsize=8)(self._load_filter_frame)
+        self._headers = {}
+        self.verbose = False  # Per-query filter logging; off on the hot path
         self.latest_quarter = self._get_latest_quarter()
+        self._latest_4 = self._get_latest_4_quarters()
         
     def _get_latest_quarter(self) -> str:
         """Get the latest quarter from dfsectorquarter.csv"""
-        try:
-            quarter_file = os.path.join(self.data_dir, 'dfsectorquarter.csv')
-            if os.path.exists(quarter_file):
-                df = pd.read_csv(quarter_file)
-                if 'Date_Quarter' in df.columns:
-                    quarters = df['Date_Quarter'].unique()
-                    quarters_sorted = sorted(quarters, key=self._quarter_to_numeric)
-                    return quarters_sorted[-1] if quarters_sorted else "2025-Q2"
-            return "2025-Q2"
-        except:
-            return "2025-Q2"
+        return _read_latest_quarter(self.data_dir)
     
     def _get_latest_4_quarters(self) -> List[str]:
         """Get the latest 4 quarters based on the latest quarter"""
-        try:
-            q = int(self.latest_quarter[0])
-            year = int(self.latest_quarter[2:4])
-            
-            quarters = []
-            for i in range(3, -1, -1):
-                calc_q = q - i
-                calc_year = year
-                
-                while calc_q <= 0:
-                    calc_q += 4
-                    calc_year -= 1
-                
-                quarters.append(f"{calc_q}Q{calc_year:02d}")
-            
-            return quarters
-        except:
-            return ["2024-Q3", "2024-Q4", "2025-Q1", "2025-Q2"]
+        return list(_latest_4_quarters(self.latest_quarter))
     
     def find_relevant_data(self, query_analysis: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -66,16 +91,14 @@ class DataDiscoveryAgent:
             data_source = query_analysis.get('data_source', 'dfsectorquarter.csv')
             filepath = os.path.join(self.data_dir, data_source)
             
-            # Load the data
-            if filepath in self.data_cache:
-                df = self.data_cache[filepath].copy()
-            else:
-                if os.path.exists(filepath):
-                    df = pd.read_csv(filepath)
-                    self.data_cache[filepath] = df.copy()
-                else:
-                    result['error'] = f"Data file not found: {filepath}"
-                    return result
+            if not os.path.exists(filepath):
+                result['error'] = f"Data file not found: {filepath}"
+                return result
+            
+            # Load only the columns this query needs
+            # (filters only use boolean masks, so the cached frame is never mutated)
+            needed_cols = self._needed_columns(filepath, query_analysis)
+            df = self._frame_memo(filepath, tuple(needed_cols))
             
             # Apply filters
             df_filtered = self._apply_filters(df, query_analysis)
@@ -86,7 +109,11 @@ class DataDiscoveryAgent:
                 
                 if not df_final.empty:
                     result['data_found'] = True
-                    result['data_table'] = df_final.to_string()
+                    # CSV serialization runs in C; aligned to_string() only when asked for
+                    if query_analysis.get('pretty', False):
+                        result['data_table'] = df_final.to_string()
+                    else:
+                        result['data_table'] = df_final.to_csv(index=False, float_format='%.4g')
                     result['row_count'] = len(df_final)
                     result['column_count'] = len(df_final.columns)
                     result['summary'] = self._create_summary(df_final, query_analysis)
@@ -96,6 +123,63 @@ class DataDiscoveryAgent:
         
         return result
     
+    def _needed_columns(self, filepath: str, query_analysis: Dict[str, Any]) -> List[str]:
+        """Identifier columns plus requested keycodes (or all prefixed metrics), in file order"""
+        if filepath not in self._headers:
+            self._headers[filepath] = pd.read_csv(filepath, nrows=0).columns
+        header = self._headers[filepath]
+        
+        keycodes = query_analysis.get('keycodes', [])
+        if keycodes:
+            is_metric = header.isin(keycodes)
+        else:
+            is_metric = header.str.startswith(('CA.', 'IS.', 'BS.', 'NT.'))
+        return header[header.isin(['TICKER', 'Date_Quarter', 'Year', 'Type']) | is_metric].tolist()
+    
+    def _load_filter_frame(self, filepath: str, columns: tuple) -> pd.DataFrame:
+        """Columns of a data file with the ticker masks added (memoized per instance)"""
+        return self._add_filter_masks(self._load_frame(filepath, list(columns)))
+    
+    def _load_frame(self, filepath: str, columns: List[str]) -> pd.DataFrame:
+        """Load columns of a CSV, through a Parquet sidecar when pyarrow is available"""
+        parquet_path = os.path.splitext(filepath)[0] + '.parquet'
+        if os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= os.path.getmtime(filepath):
+            try:
+                return pd.read_parquet(parquet_path, columns=columns)
+            except Exception as e:
+                logger.warning(f"Error reading {parquet_path}, falling back to CSV: {e}")
+        
+        category_cols = ['TICKER', 'Type', 'Date_Quarter']
+        
+        if _HAS_PARQUET:
+            # Parse the full CSV once and write the sidecar; later loads read only the needed columns
+            header = pd.read_csv(filepath, nrows=0).columns
+            df = pd.read_csv(filepath, dtype={c: 'category' for c in category_cols if c in header})
+            try:
+                df.to_parquet(parquet_path, compression='zstd')
+            except Exception as e:
+                logger.warning(f"Could not write Parquet cache {parquet_path}: {e}")
+            return df[columns]
+        
+        # Without pyarrow, push the column selection down to the CSV parser
+        return pd.read_csv(filepath, usecols=columns,
+                           dtype={c: 'category' for c in category_cols if c in columns})
+    
+    def _add_filter_masks(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Precompute ticker masks once so repeated queries only do boolean selection"""
+        # Categorical keys make isin an integer-code lookup (no-op if already category)
+        for col in ('TICKER', 'Type', 'Date_Quarter'):
+            if col in df.columns:
+                df[col] = df[col].astype('category')
+        
+        if 'TICKER' in df.columns:
+            # Measure each distinct ticker once, then gather by code (code -1 = missing -> length 0)
+            tkr_len = np.append(df['TICKER'].cat.categories.str.len().to_numpy(), 0).astype('int8')
+            df['_tkr_len'] = tkr_len[df['TICKER'].cat.codes.to_numpy()]
+            df['_is_bank3'] = (df['_tkr_len'] == 3).to_numpy()
+            df['_is_sub_sector'] = df['TICKER'].isin(_SUB_SECTOR_SET).to_numpy()
+        return df
+    
     def _apply_filters(self, df: pd.DataFrame, query_analysis: Dict[str, Any]) -> pd.DataFrame:
         """Apply filters for tickers and timeframe"""
         
@@ -107,44 +191,44 @@ class DataDiscoveryAgent:
             # Special case: ALL_BANKS means get all individual banks
             if 'ALL_BANKS' in tickers:
                 # Get all rows where TICKER is exactly 3 characters (individual banks)
-                df = df[df['TICKER'].str.len() == 3]
-                print(f"Filtered to all individual banks (3-letter tickers), rows: {len(df)}")
+                df = df[df['_is_bank3']]
+                if self.verbose:
+                    logger.debug(f"Filtered to all individual banks (3-letter tickers), rows: {len(df)}")
             else:
                 # Check if any tickers are sector names
-                sector_names = ['Sector', 'SOCB', 'Private_1', 'Private_2', 'Private_3']
-                has_sectors = any(t in sector_names for t in tickers)
+                has_sectors = any(t in _SECTOR_SET for t in tickers)
                 
                 if has_sectors and need_components:
-                    # Include both sector data AND component banks
-                    # First get the sector rows
-                    sector_df = df[df['TICKER'].isin(tickers)]
+                    # Include both sector data AND component banks in one mask
+                    # (rows are unique by position, so no concat/dedup is needed)
+                    mask_sector = df['TICKER'].isin(tickers)
                     
                     # Then get component banks by matching Type column
                     # Special handling for "Sector" - get all individual banks
                     if 'Sector' in tickers:
                         # Get all individual banks (3-letter tickers)
                         # IMPORTANT: Exclude sub-sector aggregates (SOCB, Private_1, etc.)
-                        sub_sectors = ['SOCB', 'Private_1', 'Private_2', 'Private_3']
-                        component_df = df[(df['TICKER'].str.len() == 3) & 
-                                         (~df['TICKER'].isin(sub_sectors))]
+                        mask_component = df['_is_bank3'] & ~df['_is_sub_sector']
                     else:
                         # Get banks matching the specific sector types
-                        component_df = df[df['Type'].isin(tickers)]
+                        mask_component = df['Type'].isin(tickers)
                     
-                    # Combine both
-                    df = pd.concat([sector_df, component_df]).drop_duplicates()
-                    print(f"Filtered to sectors {tickers} with components, rows: {len(df)}")
+                    df = df[mask_sector | mask_component]
+                    if self.verbose:
+                        logger.debug(f"Filtered to sectors {tickers} with components, rows: {len(df)}")
                 elif has_sectors:
                     # Only sector aggregated data
                     df = df[df['TICKER'].isin(tickers)]
-                    print(f"Filtered to sectors only: {tickers}, rows: {len(df)}")
+                    if self.verbose:
+                        logger.debug(f"Filtered to sectors only: {tickers}, rows: {len(df)}")
                 else:
                     # Regular ticker filtering
                     df = df[df['TICKER'].isin(tickers)]
-                    print(f"Filtered to {len(tickers)} tickers: {tickers}, rows: {len(df)}")
+                    if self.verbose:
+                        logger.debug(f"Filtered to {len(tickers)} tickers: {tickers}, rows: {len(df)}")
         
         # Filter by timeframe (now expects a list)
-        latest_4 = self._get_latest_4_quarters()
+        latest_4 = self._latest_4
         timeframe = query_analysis.get('timeframe', latest_4)
         
         # Ensure timeframe is a list
@@ -158,58 +242,53 @@ class DataDiscoveryAgent:
             # Quarterly data - filter by the list of quarters
             if timeframe:
                 df = df[df['Date_Quarter'].isin(timeframe)]
-                print(f"Filtered to quarters {timeframe}, rows: {len(df)}")
+                if self.verbose:
+                    logger.debug(f"Filtered to quarters {timeframe}, rows: {len(df)}")
         
         elif 'Year' in df.columns:
-            # Yearly data - extract years from timeframe if they're year values
-            years = []
-            for t in timeframe:
-                if isinstance(t, str) and t.isdigit() and len(t) == 4:
-                    years.append(int(t))
+            # Yearly data - extract years from timeframe if they're year values (str or int)
+            years = pd.to_numeric(pd.Series(timeframe, dtype=object), errors='coerce').dropna()
+            years = years[years.between(1000, 9999)].astype(int).tolist()
             
             if years:
                 df = df[df['Year'].isin(years)]
-                print(f"Filtered to years {years}, rows: {len(df)}")
+                if self.verbose:
+                    logger.debug(f"Filtered to years {years}, rows: {len(df)}")
             else:
                 # If no valid years, get latest year
                 latest_year = df['Year'].max()
                 df = df[df['Year'] == latest_year]
-                print(f"Filtered to latest year, rows: {len(df)}")
+                if self.verbose:
+                    logger.debug(f"Filtered to latest year, rows: {len(df)}")
         
         return df
     
     def _select_columns(self, df: pd.DataFrame, query_analysis: Dict[str, Any]) -> pd.DataFrame:
         """Select only relevant columns"""
         
-        # Always include identifier columns  
-        id_cols = []
-        for col in ['TICKER', 'Date_Quarter', 'Year', 'Type']:
-            if col in df.columns:
-                id_cols.append(col)
+        # Always include identifier columns (hashed Index lookup, list order kept)
+        id_cols = pd.Index(['TICKER', 'Date_Quarter', 'Year', 'Type']).intersection(df.columns, sort=False).tolist()
         
         # Add keycode columns
         keycodes = query_analysis.get('keycodes', [])
-        selected_cols = id_cols.copy()
         
         if keycodes:
             # Only include specified keycodes
-            for keycode in keycodes:
-                if keycode in df.columns:
-                    selected_cols.append(keycode)
-                else:
-                    print(f"Warning: Keycode {keycode} not found in data")
+            kept = pd.Index(keycodes).intersection(df.columns, sort=False).tolist()
+            if len(kept) < len(keycodes):
+                logger.warning(f"{len(keycodes) - len(kept)} keycode(s) not found in data")
         else:
-            # If no specific keycodes, include all CA.* and IS.* columns
-            for col in df.columns:
-                if col.startswith(('CA.', 'IS.', 'BS.', 'NT.')):
-                    selected_cols.append(col)
-                    if len(selected_cols) > 20:  # Limit columns if too many
-                        break
-        
-        # Return dataframe with selected columns
-        return df[selected_cols] if selected_cols else df
+            # If no specific keycodes, include the first 20 CA./IS./BS./NT. columns
+            kept = df.columns[df.columns.str.startswith(('CA.', 'IS.', 'BS.', 'NT.'))][:20].tolist()
+        selected_cols = id_cols + kept
+        
+        # Return dataframe with selected columns (helper mask columns never leave this class)
+        if not selected_cols:
+            return df.drop(columns=['_tkr_len', '_is_bank3', '_is_sub_sector'], errors='ignore')
+        return df[selected_cols]
     
-    def _quarter_to_numeric(self, quarter_str: str) -> float:
+    @staticmethod
+    def _quarter_to_numeric(quarter_str: str) -> float:
         """Convert quarter string to numeric for sorting"""
         try:
             q = int(quarter_str[0])
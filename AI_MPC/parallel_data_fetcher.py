@@ -1,9 +1,17 @@
 #%% Import libraries
 import asyncio
+import atexit
+import logging
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, List, Any, Optional, Tuple
 import time
 
+logger = logging.getLogger(__name__)
+
+# One process-wide pool instead of creating and joining threads on every call
+_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix='mpc')
+atexit.register(_EXECUTOR.shutdown)
+
 def fetch_quantitative_data_parallel(query_analysis: Dict[str, Any], 
                                     discovery_agent,
                                     valuation_formatter=None) -> Dict[str, Any]:
@@ -23,37 +31,45 @@ def fetch_quantitative_data_parallel(query_analysis: Dict[str, Any],
         'valuation_data': ""
     }
     
-    with ThreadPoolExecutor(max_workers=2) as executor:
-        futures = []
-        
-        # Submit data discovery task
-        future_data = executor.submit(
-            discovery_agent.find_relevant_data,
-            query_analysis
-        )
-        futures.append(('data', future_data))
-        
-        # Submit valuation task if needed
-        if query_analysis.get('valuation', False) and valuation_formatter:
-            tickers = query_analysis.get('tickers', [])
-            if tickers:
-                future_val = executor.submit(
-                    valuation_formatter,
-                    tickers
-                )
-                futures.append(('valuation', future_val))
-        
-        # Collect results as they complete
-        for task_type, future in futures:
-            try:
-                if task_type == 'data':
-                    results['data_result'] = future.result(timeout=30)
-                elif task_type == 'valuation':
-                    results['valuation_data'] = future.result(timeout=30)
-            except Exception as e:
-                print(f"Error in parallel fetch ({task_type}): {str(e)}")
-                if task_type == 'data':
-                    results['data_result'] = {'data_found': False, 'error': str(e)}
+    tickers = query_analysis.get('tickers', [])
+    need_valuation = bool(query_analysis.get('valuation', False) and valuation_formatter and tickers)
+    
+    # Only one task: run it inline instead of paying for a thread pool
+    if not need_valuation:
+        try:
+            results['data_result'] = discovery_agent.find_relevant_data(query_analysis)
+        except Exception as e:
+            logger.error(f"Error in data fetch: {str(e)}")
+            results['data_result'] = {'data_found': False, 'error': str(e)}
+        return results
+    
+    futures = []
+    
+    # Submit data discovery task
+    future_data = _EXECUTOR.submit(
+        discovery_agent.find_relevant_data,
+        query_analysis
+    )
+    futures.append(('data', future_data))
+    
+    # Submit valuation task
+    future_val = _EXECUTOR.submit(
+        valuation_formatter,
+        tickers
+    )
+    futures.append(('valuation', future_val))
+    
+    # Collect results as they complete
+    for task_type, future in futures:
+        try:
+            if task_type == 'data':
+                results['data_result'] = future.result(timeout=30)
+            elif task_type == 'valuation':
+                results['valuation_data'] = future.result(timeout=30)
+        except Exception as e:
+            logger.error(f"Error in parallel fetch ({task_type}): {str(e)}")
+            if task_type == 'data':
+                results['data_result'] = {'data_found': False, 'error': str(e)}
     
     return results
 
@@ -86,68 +102,69 @@ def fetch_qualitative_data_parallel(tickers: List[str],
     # If need_components is True, expand tickers to include component banks for valuation
     valuation_tickers = list(tickers)  # Copy the original list
     if need_components and need_valuation:
-        import pandas as pd
-        import os
         try:
-            comments_path = os.path.join(qualitative_handler.data_dir, 'banking_comments.xlsx')
-            if os.path.exists(comments_path):
-                comments_df = pd.read_excel(comments_path)
+            comments_df = qualitative_handler.get_comments_df()
+            if comments_df is not None:
                 
                 expanded_tickers = []
                 for ticker in tickers:
                     expanded_tickers.append(ticker)
                     
                     # Check if it's a sector
-                    if 'SECTOR' in comments_df.columns:
-                        sector_entries = comments_df[comments_df['TICKER'] == ticker]
-                        if not sector_entries.empty:
-                            is_sector = sector_entries['SECTOR'].iloc[0] == 'Sector'
-                            
-                            if is_sector:
-                                # Get all banks in this sector
-                                sector_banks = comments_df[
-                                    (comments_df['SECTOR'] == ticker) & 
-                                    (comments_df['TICKER'] != ticker)
-                                ]['TICKER'].unique().tolist()
-                                expanded_tickers.extend(sector_banks)
+                    if qualitative_handler.is_sector_ticker(ticker):
+                        # Get all banks in this sector
+                        sector_banks = qualitative_handler.get_sector_members(ticker)
+                        expanded_tickers.extend(sector_banks)
                 
                 # Remove duplicates while preserving order
                 valuation_tickers = list(dict.fromkeys(expanded_tickers))
         except Exception as e:
-            print(f"Error expanding tickers for valuation: {str(e)}")
+            logger.error(f"Error expanding tickers for valuation: {str(e)}")
     
-    with ThreadPoolExecutor(max_workers=2) as executor:
-        futures = []
-        
-        # Submit qualitative data collection task
-        future_qual = executor.submit(
-            collect_qualitative_batch,
-            tickers,
-            timeframe,
-            qualitative_handler,
-            need_components
-        )
-        futures.append(('qualitative', future_qual))
-        
-        # Submit valuation task if needed with expanded tickers
-        if need_valuation and valuation_formatter and valuation_tickers:
-            future_val = executor.submit(
-                valuation_formatter,
-                valuation_tickers  # Use expanded tickers for valuation
+    # Only one task: run it inline instead of paying for a thread pool
+    if not (need_valuation and valuation_formatter and valuation_tickers):
+        try:
+            results['qualitative_data'] = collect_qualitative_batch(
+                tickers,
+                timeframe,
+                qualitative_handler,
+                need_components
             )
-            futures.append(('valuation', future_val))
-        
-        # Collect results
-        for task_type, future in futures:
-            try:
-                if task_type == 'qualitative':
-                    results['qualitative_data'] = future.result(timeout=30)
-                elif task_type == 'valuation':
-                    results['valuation_data'] = future.result(timeout=30)
-            except Exception as e:
-                print(f"Error in parallel fetch ({task_type}): {str(e)}")
-                if task_type == 'qualitative':
-                    results['qualitative_data'] = f"Error fetching qualitative data: {str(e)}"
+        except Exception as e:
+            logger.error(f"Error in qualitative fetch: {str(e)}")
+            results['qualitative_data'] = f"Error fetching qualitative data: {str(e)}"
+        return results
+    
+    futures = []
+    
+    # Submit qualitative data collection task
+    future_qual = _EXECUTOR.submit(
+        collect_qualitative_batch,
+        tickers,
+        timeframe,
+        qualitative_handler,
+        need_components
+    )
+    futures.append(('qualitative', future_qual))
+    
+    # Submit valuation task with expanded tickers
+    future_val = _EXECUTOR.submit(
+        valuation_formatter,
+        valuation_tickers  # Use expanded tickers for valuation
+    )
+    futures.append(('valuation', future_val))
+    
+    # Collect results
+    for task_type, future in futures:
+        try:
+            if task_type == 'qualitative':
+                results['qualitative_data'] = future.result(timeout=30)
+            elif task_type == 'valuation':
+                results['valuation_data'] = future.result(timeout=30)
+        except Exception as e:
+            logger.error(f"Error in parallel fetch ({task_type}): {str(e)}")
+            if task_type == 'qualitative':
+                results['qualitative_data'] = f"Error fetching qualitative data: {str(e)}"
     
     return results
 
@@ -158,9 +175,13 @@ def collect_qualitative_batch(tickers: List[str],
                              need_components: bool = False) -> str:
     """
     Helper function to collect qualitative data for batch processing
-    Can be optimized further with batch queries
+    Without components, all tickers are formatted in one handler call
     """
-    # Use the updated collect_qualitative_data function with need_components
+    if not need_components:
+        formatted = qualitative_handler.format_qualitative_data_batch(tickers, timeframe)
+        return "\n\n".join(formatted.values())
+    
+    # Component banks depend on each sector's membership, so keep the per-sector path
     from AI_MPC.qualitative_data_collector import collect_qualitative_data
     return collect_qualitative_data(tickers, timeframe, qualitative_handler, need_components)
 
@@ -179,35 +200,43 @@ async def fetch_all_data_async(query_type: str,
     Returns:
         Combined results dictionary
     """
-    loop = asyncio.get_event_loop()
+    tickers = query_analysis.get('tickers', [])
+    valuation_formatter = handlers.get('valuation_formatter')
     
+    # Schedule each task on the loop's default thread pool directly, rather than
+    # nesting the sync helpers' own executor inside run_in_executor
     if query_type == 'quantitative':
-        # Run quantitative parallel fetch in executor
-        result = await loop.run_in_executor(
-            None,
-            fetch_quantitative_data_parallel,
-            query_analysis,
-            handlers.get('discovery_agent'),
-            handlers.get('valuation_formatter')
-        )
+        main_key = 'data_result'
+        tasks = [asyncio.to_thread(handlers['discovery_agent'].find_relevant_data, query_analysis)]
     else:  # qualitative
-        # Extract needed data
-        tickers = query_analysis.get('tickers', [])
-        timeframe = query_analysis.get('timeframe', [])
-        need_valuation = query_analysis.get('valuation', False)
-        
-        # Run qualitative parallel fetch in executor
-        result = await loop.run_in_executor(
-            None,
-            fetch_qualitative_data_parallel,
+        main_key = 'qualitative_data'
+        tasks = [asyncio.to_thread(
+            collect_qualitative_batch,
             tickers,
-            timeframe,
-            handlers.get('qualitative_handler'),
-            handlers.get('valuation_formatter'),
-            need_valuation
-        )
+            query_analysis.get('timeframe', []),
+            handlers.get('qualitative_handler')
+        )]
+    
+    if query_analysis.get('valuation', False) and valuation_formatter and tickers:
+        tasks.append(asyncio.to_thread(valuation_formatter, tickers))
+    
+    main_result, *val_result = await asyncio.gather(*tasks, return_exceptions=True)
     
-    return result
+    results = {main_key: main_result, 'valuation_data': ""}
+    if isinstance(main_result, Exception):
+        logger.error(f"Error in async fetch ({query_type}): {str(main_result)}")
+        if query_type == 'quantitative':
+            results[main_key] = {'data_found': False, 'error': str(main_result)}
+        else:
+            results[main_key] = f"Error fetching qualitative data: {str(main_result)}"
+    
+    if val_result:
+        if isinstance(val_result[0], Exception):
+            logger.error(f"Error in async fetch (valuation): {str(val_result[0])}")
+        else:
+            results['valuation_data'] = val_result[0]
+    
+    return results
 
 
 def benchmark_parallel_vs_sequential(func_parallel, func_sequential, *args):
@@ -1,7 +1,45 @@
 #%% Import libraries
 from typing import List, Dict, Any
 import pandas as pd
-import os
+import io
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _text_col(df: pd.DataFrame, col: str) -> pd.Series:
+    """Column as text for vectorized formatting, rendered like the row.get(col, 'N/A') f-strings"""
+    if col not in df.columns:
+        return pd.Series('N/A', index=df.index)
+    # Missing cells print as 'nan', as they do in an f-string
+    return df[col].astype(str).fillna('nan')
+
+
+def _sort_by_quarter(df: pd.DataFrame) -> pd.DataFrame:
+    """Chronological order via the loader's integer quarter key (string sort if it is missing)"""
+    if '_Q_ORD' in df.columns:
+        return df.sort_values('_Q_ORD', kind='stable')
+    return df.sort_values('QUARTER')
+
+
+class _BlockWriter:
+    """Single output buffer whose blocks are separated by a blank line, like "\n\n".join"""
+    
+    def __init__(self):
+        self._buf = io.StringIO()
+        self._blocks = 0
+    
+    def new_block(self, text: str = ""):
+        if self._blocks:
+            self._buf.write("\n\n")
+        self._blocks += 1
+        self._buf.write(text)
+    
+    def write(self, text: str):
+        self._buf.write(text)
+    
+    def getvalue(self) -> str:
+        return self._buf.getvalue()
+
 
 def collect_qualitative_data(tickers: List[str], timeframe: List[str], qualitative_handler, need_components: bool = False) -> str:
     """
@@ -17,150 +55,62 @@ def collect_qualitative_data(tickers: List[str], timeframe: List[str], qualitati
         Combined qualitative data string
     """
     
-    all_qualitative_data = []
+    out = _BlockWriter()
     processed_tickers = set()  # Track processed tickers to avoid duplicates
     
-    # If need_components is True and we have a sector, get banks from that sector
-    if need_components:
-        # Load banking comments to get bank-sector mapping from SECTOR column
+    for ticker in tickers:
+        if ticker in processed_tickers:
+            continue
+        
         try:
-            comments_path = os.path.join(qualitative_handler.data_dir, 'banking_comments.xlsx')
-            if os.path.exists(comments_path):
-                comments_df = pd.read_excel(comments_path)
-                
-                # Process each ticker
-                for ticker in tickers:
-                    if ticker in processed_tickers:
-                        continue
-                    
-                    # Check if it's a sector by checking if this ticker has SECTOR='Sector'
-                    is_sector = False
-                    if 'SECTOR' in comments_df.columns:
-                        sector_entries = comments_df[comments_df['TICKER'] == ticker]
-                        if not sector_entries.empty:
-                            # If this ticker has SECTOR='Sector', it's a sector-level ticker
-                            is_sector = sector_entries['SECTOR'].iloc[0] == 'Sector'
-                    
-                    if is_sector:
-                        # Get sector-level analysis first
-                        sector_data = qualitative_handler.format_qualitative_data(
-                            ticker=ticker,
-                            timeframe=timeframe,
-                            is_sector=True
-                        )
-                        all_qualitative_data.append(f"=== SECTOR OVERVIEW: {ticker} ===\n{sector_data}")
-                        processed_tickers.add(ticker)
-                        
-                        # Get all individual banks based on the ticker type
-                        if ticker == 'Sector':
-                            # For overall Sector, get all individual banks (3-letter tickers)
-                            # excluding sub-sector aggregates
-                            sub_sectors = ['SOCB', 'Private_1', 'Private_2', 'Private_3']
-                            sector_banks = comments_df[
-                                (comments_df['TICKER'].str.len() == 3) & 
-                                (~comments_df['TICKER'].isin(sub_sectors)) &
-                                (comments_df['TICKER'] != 'Sector')
-                            ]['TICKER'].unique()
-                        else:
-                            # For sub-sectors (SOCB, Private_1, etc.), get banks with matching SECTOR
-                            sector_banks = comments_df[
-                                (comments_df['SECTOR'] == ticker) & 
-                                (comments_df['TICKER'] != ticker)
-                            ]['TICKER'].unique()
-                        
-                        if len(sector_banks) > 0:
-                            all_qualitative_data.append(f"\n=== INDIVIDUAL BANKS IN {ticker} ===")
-                            for bank in sector_banks:
-                                if bank not in processed_tickers:
-                                    bank_data = qualitative_handler.format_qualitative_data(
-                                        ticker=bank,
-                                        timeframe=timeframe,
-                                        is_sector=False
-                                    )
-                                    all_qualitative_data.append(bank_data)
-                                    processed_tickers.add(bank)
-                    else:
-                        # Individual bank - process normally
-                        ticker_data = qualitative_handler.format_qualitative_data(
-                            ticker=ticker,
-                            timeframe=timeframe,
-                            is_sector=is_sector  # Use the detected is_sector value
-                        )
-                        all_qualitative_data.append(ticker_data)
-                        processed_tickers.add(ticker)
-            else:
-                # Fallback if file doesn't exist - process without components
-                for ticker in tickers:
-                    if ticker not in processed_tickers:
-                        # Without the data file, we can't determine if it's a sector
-                        ticker_data = qualitative_handler.format_qualitative_data(
-                            ticker=ticker,
-                            timeframe=timeframe,
-                            is_sector=False  # Default to False without data
-                        )
-                        all_qualitative_data.append(ticker_data)
-                        processed_tickers.add(ticker)
-        except Exception as e:
-            print(f"Error processing with components: {str(e)}")
-            # Fallback to simple processing
-            for ticker in tickers:
-                if ticker not in processed_tickers:
-                    ticker_data = qualitative_handler.format_qualitative_data(
-                        ticker=ticker,
+            # Sector status and rows come from the handler's index
+            # (not a sector, no rows when banking_comments.xlsx is missing)
+            is_sector = qualitative_handler.is_sector_ticker(ticker)
+            with_components = need_components and is_sector
+            rows_df = qualitative_handler.get_ticker_rows(ticker)
+            
+            # Sector-level analysis first (then its individual banks below)
+            out.new_block(f"=== SECTOR OVERVIEW: {ticker} ===\n" if with_components else "")
+            qualitative_handler.format_qualitative_data(
+                ticker=ticker,
+                timeframe=timeframe,
+                is_sector=is_sector,
+                rows_df=rows_df,
+                out=out
+            )
+            processed_tickers.add(ticker)
+            
+            if not with_components:
+                continue
+            
+            sector_banks = qualitative_handler.get_sector_banks(ticker)
+            
+            if len(sector_banks) > 0:
+                out.new_block(f"\n=== INDIVIDUAL BANKS IN {ticker} ===")
+                pending_banks = [bank for bank in sector_banks if bank not in processed_tickers]
+                for bank in pending_banks:
+                    out.new_block()
+                    qualitative_handler.format_qualitative_data(
+                        ticker=bank,
                         timeframe=timeframe,
-                        is_sector=False  # Default to False on error
+                        is_sector=False,
+                        rows_df=qualitative_handler.get_ticker_rows(bank),
+                        out=out
                     )
-                    all_qualitative_data.append(ticker_data)
-                    processed_tickers.add(ticker)
-    else:
-        # Simple processing without components - need to detect if sector
-        try:
-            comments_path = os.path.join(qualitative_handler.data_dir, 'banking_comments.xlsx')
-            if os.path.exists(comments_path):
-                comments_df = pd.read_excel(comments_path)
-                
-                for ticker in tickers:
-                    if ticker not in processed_tickers:
-                        # Check if it's a sector
-                        is_sector = False
-                        if 'SECTOR' in comments_df.columns:
-                            sector_entries = comments_df[comments_df['TICKER'] == ticker]
-                            if not sector_entries.empty:
-                                is_sector = sector_entries['SECTOR'].iloc[0] == 'Sector'
-                        
-                        ticker_data = qualitative_handler.format_qualitative_data(
-                            ticker=ticker,
-                            timeframe=timeframe,
-                            is_sector=is_sector
-                        )
-                        all_qualitative_data.append(ticker_data)
-                        processed_tickers.add(ticker)
-            else:
-                # No data file available
-                for ticker in tickers:
-                    if ticker not in processed_tickers:
-                        ticker_data = qualitative_handler.format_qualitative_data(
-                            ticker=ticker,
-                            timeframe=timeframe,
-                            is_sector=False
-                        )
-                        all_qualitative_data.append(ticker_data)
-                        processed_tickers.add(ticker)
+                processed_tickers.update(pending_banks)
         except Exception as e:
-            print(f"Error in simple processing: {str(e)}")
-            # Final fallback
-            for ticker in tickers:
-                if ticker not in processed_tickers:
-                    ticker_data = qualitative_handler.format_qualitative_data(
-                        ticker=ticker,
-                        timeframe=timeframe,
-                        is_sector=False
-                    )
-                    all_qualitative_data.append(ticker_data)
-                    processed_tickers.add(ticker)
+            logger.error(f"Error collecting qualitative data for {ticker}: {str(e)}")
+            if ticker not in processed_tickers:
+                out.new_block()
+                qualitative_handler.format_qualitative_data(
+                    ticker=ticker,
+                    timeframe=timeframe,
+                    is_sector=False,
+                    out=out
+                )
+                processed_tickers.add(ticker)
     
-    # Combine all data
-    return "\n\n".join(all_qualitative_data)
+    return out.getvalue()
 
 
 def collect_qualitative_data_batch(tickers: List[str], timeframe: List[str], qualitative_handler, need_components: bool = False) -> str:
@@ -184,59 +134,35 @@ def collect_qualitative_data_batch(tickers: List[str], timeframe: List[str], qua
     
     # Load comments data once
     try:
-        comments_path = qualitative_handler.data_dir + '/banking_comments.xlsx'
-        comments_df = pd.read_excel(comments_path)
-        
-        # First, determine which tickers to fetch
-        tickers_to_fetch = list(tickers)  # Start with original tickers
+        comments_df = qualitative_handler.get_comments_df()
         
-        # If need_components, expand tickers to include banks in sectors
-        if need_components:
-            expanded_tickers = []
-            for ticker in tickers:
-                expanded_tickers.append(ticker)
-                
-                # Check if this ticker is a sector
-                is_sector = False
-                if 'SECTOR' in comments_df.columns:
-                    sector_entries = comments_df[comments_df['TICKER'] == ticker]
-                    if not sector_entries.empty:
-                        is_sector = sector_entries['SECTOR'].iloc[0] == 'Sector'
-                
-                if is_sector:
-                    # Get all individual banks based on the ticker type
-                    if ticker == 'Sector':
-                        # For overall Sector, get all individual banks (3-letter tickers)
-                        # excluding sub-sector aggregates
-                        sub_sectors = ['SOCB', 'Private_1', 'Private_2', 'Private_3']
-                        sector_banks = comments_df[
-                            (comments_df['TICKER'].str.len() == 3) & 
-                            (~comments_df['TICKER'].isin(sub_sectors)) &
-                            (comments_df['TICKER'] != 'Sector')
-                        ]['TICKER'].unique().tolist()
-                    else:
-                        # For sub-sectors (SOCB, Private_1, etc.), get banks with matching SECTOR
-                        sector_banks = comments_df[
-                            (comments_df['SECTOR'] == ticker) & 
-                            (comments_df['TICKER'] != ticker)
-                        ]['TICKER'].unique().tolist()
-                    expanded_tickers.extend(sector_banks)
+        # Determine which tickers to fetch (uppercased for matching); if need_components,
+        # expand sectors to their banks, resolving each sector only once
+        tickers_upper = set()
+        expanded_sectors = set()
+        for ticker in tickers:
+            tickers_upper.add(ticker.upper())
             
-            # Remove duplicates
-            tickers_to_fetch = list(dict.fromkeys(expanded_tickers))
-        
-        # Normalize tickers for matching
-        tickers_upper = [t.upper() for t in tickers_to_fetch]
+            if (need_components and ticker not in expanded_sectors
+                    and qualitative_handler.is_sector_ticker(ticker)):
+                expanded_sectors.add(ticker)
+                tickers_upper.update(bank.upper() for bank in qualitative_handler.get_sector_banks(ticker))
         
         # Filter for all relevant tickers at once
-        mask = comments_df['TICKER'].str.upper().isin(tickers_upper)
+        mask = comments_df['_TKR_U'].isin(tickers_upper)
         if timeframe:
             mask = mask & comments_df['QUARTER'].isin(timeframe)
         
         filtered_df = comments_df[mask]
         
+        # One groupby instead of an uppercase scan per ticker
+        ticker_groups = dict(list(filtered_df.groupby('_TKR_U', sort=False, observed=True)))
+        empty_df = filtered_df.iloc[:0]
+        if need_components:
+            bank_groups = dict(list(filtered_df.groupby('TICKER', sort=False, observed=True)))
+        
         # Group by ticker and format
-        all_qualitative_data = []
+        out = _BlockWriter()
         
         # Process sectors first if need_components
         if need_components:
@@ -244,64 +170,46 @@ def collect_qualitative_data_batch(tickers: List[str], timeframe: List[str], qua
                 ticker_upper = ticker.upper()
                 
                 # Check if it's a sector dynamically
-                is_sector = False
-                if 'SECTOR' in comments_df.columns:
-                    sector_entries = comments_df[comments_df['TICKER'] == ticker]
-                    if not sector_entries.empty:
-                        is_sector = sector_entries['SECTOR'].iloc[0] == 'Sector'
+                is_sector = qualitative_handler.is_sector_ticker(ticker)
                 
                 if is_sector:
                     # Add sector overview
-                    sector_data = filtered_df[filtered_df['TICKER'].str.upper() == ticker_upper]
+                    sector_data = ticker_groups.get(ticker_upper, empty_df)
                     if not sector_data.empty:
                         formatted_text = f"=== SECTOR OVERVIEW: {ticker} ===\n"
-                        for _, row in sector_data.iterrows():
-                            formatted_text += f"\n{row.get('QUARTER', 'N/A')}: {row.get('COMMENT', 'N/A')}\n"
-                        all_qualitative_data.append(formatted_text)
+                        lines = '\n' + _text_col(sector_data, 'QUARTER') + ': ' + _text_col(sector_data, 'COMMENT') + '\n'
+                        formatted_text += lines.str.cat()
+                        out.new_block(formatted_text)
                     
-                    # Add individual banks in sector
-                    if ticker == 'Sector':
-                        # For overall Sector, get all individual banks
-                        sub_sectors = ['SOCB', 'Private_1', 'Private_2', 'Private_3']
-                        sector_banks = filtered_df[
-                            (filtered_df['TICKER'].str.len() == 3) & 
-                            (~filtered_df['TICKER'].isin(sub_sectors)) &
-                            (filtered_df['TICKER'] != 'Sector')
-                        ]['TICKER'].unique()
-                    else:
-                        # For sub-sectors, get banks with matching SECTOR
-                        sector_banks = filtered_df[
-                            (filtered_df['SECTOR'] == ticker) & 
-                            (filtered_df['TICKER'] != ticker)
-                        ]['TICKER'].unique()
+                    # Add individual banks in sector that have rows in the timeframe (filtered order)
+                    members = set(qualitative_handler.get_sector_banks(ticker))
+                    sector_banks = [bank for bank in bank_groups if bank in members]
                     
                     if len(sector_banks) > 0:
-                        all_qualitative_data.append(f"\n=== INDIVIDUAL BANKS IN {ticker} ===")
+                        out.new_block(f"\n=== INDIVIDUAL BANKS IN {ticker} ===")
                         for bank in sector_banks:
-                            bank_data = filtered_df[filtered_df['TICKER'] == bank]
+                            bank_data = bank_groups[bank]
                             if not bank_data.empty:
                                 formatted_text = f"\n=== {bank} Bank Analysis ===\n"
-                                bank_data = bank_data.sort_values('QUARTER')
-                                for _, row in bank_data.iterrows():
-                                    formatted_text += f"\n{row.get('QUARTER', 'N/A')}: {row.get('COMMENT', 'N/A')}\n"
-                                all_qualitative_data.append(formatted_text)
+                                bank_data = _sort_by_quarter(bank_data)
+                                lines = '\n' + _text_col(bank_data, 'QUARTER') + ': ' + _text_col(bank_data, 'COMMENT') + '\n'
+                                formatted_text += lines.str.cat()
+                                out.new_block(formatted_text)
         else:
             # Normal processing without components
+            analysis_text = None  # Quarterly sector analysis, shared by every sector ticker
+            
             for ticker in tickers:
                 ticker_upper = ticker.upper()
                 
                 # Check if it's a sector dynamically
-                is_sector = False
-                if 'SECTOR' in comments_df.columns:
-                    sector_entries = comments_df[comments_df['TICKER'] == ticker]
-                    if not sector_entries.empty:
-                        is_sector = sector_entries['SECTOR'].iloc[0] == 'Sector'
+                is_sector = qualitative_handler.is_sector_ticker(ticker)
                 
                 # Get data for this ticker
-                ticker_data = filtered_df[filtered_df['TICKER'].str.upper() == ticker_upper]
+                ticker_data = ticker_groups.get(ticker_upper, empty_df)
                 
                 if ticker_data.empty:
-                    all_qualitative_data.append(f"No data available for {ticker} in quarters: {', '.join(timeframe) if timeframe else 'all'}")
+                    out.new_block(f"No data available for {ticker} in quarters: {', '.join(timeframe) if timeframe else 'all'}")
                     continue
                 
                 # Format data based on type
@@ -309,41 +217,43 @@ def collect_qualitative_data_batch(tickers: List[str], timeframe: List[str], qua
                     # Sector-level analysis
                     formatted_text = f"=== {ticker} Sector Analysis ===\n"
                     
-                    # Get quarterly analysis if available
-                    analysis_path = qualitative_handler.data_dir + '/quarterly_analysis_results.xlsx'
-                    try:
-                        analysis_df = pd.read_excel(analysis_path)
-                        if timeframe:
-                            analysis_df = analysis_df[analysis_df['QUARTER'].isin(timeframe)]
-                        
-                        for _, row in analysis_df.iterrows():
-                            formatted_text += f"\n{row.get('QUARTER', 'N/A')}:\n"
-                            formatted_text += f"Key Changes: {row.get('KEY_CHANGES', 'N/A')}\n"
-                            formatted_text += f"Individual Highlights: {row.get('INDIVIDUAL_HIGHLIGHTS', 'N/A')}\n"
-                            formatted_text += f"Forward Outlook: {row.get('FORWARD_OUTLOOK', 'N/A')}\n"
-                            formatted_text += f"Full Analysis: {row.get('FULL_ANALYSIS', 'N/A')}\n"
-                            formatted_text += "-" * 50 + "\n"
-                    except:
-                        pass
+                    # Get quarterly analysis if available (built once, on the first sector)
+                    if analysis_text is None:
+                        analysis_text = ''
+                        try:
+                            analysis_df = qualitative_handler.get_analysis_df()
+                            if timeframe:
+                                analysis_df = analysis_df[analysis_df['QUARTER'].isin(timeframe)]
+                            
+                            lines = ('\n' + _text_col(analysis_df, 'QUARTER') + ':\n'
+                                     + 'Key Changes: ' + _text_col(analysis_df, 'KEY_CHANGES') + '\n'
+                                     + 'Individual Highlights: ' + _text_col(analysis_df, 'INDIVIDUAL_HIGHLIGHTS') + '\n'
+                                     + 'Forward Outlook: ' + _text_col(analysis_df, 'FORWARD_OUTLOOK') + '\n'
+                                     + 'Full Analysis: ' + _text_col(analysis_df, 'FULL_ANALYSIS') + '\n'
+                                     + '-' * 50 + '\n')
+                            analysis_text = lines.str.cat()
+                        except:
+                            pass
+                    formatted_text += analysis_text
                     
                     # Add sector comments
-                    for _, row in ticker_data.iterrows():
-                        formatted_text += f"\n{row.get('QUARTER', 'N/A')} Comment: {row.get('COMMENT', 'N/A')}\n"
+                    lines = '\n' + _text_col(ticker_data, 'QUARTER') + ' Comment: ' + _text_col(ticker_data, 'COMMENT') + '\n'
+                    formatted_text += lines.str.cat()
                 else:
                     # Individual bank comments
                     formatted_text = f"=== {ticker} Bank Analysis ===\n"
                     
                     # Sort by quarter for chronological order
-                    ticker_data = ticker_data.sort_values('QUARTER')
+                    ticker_data = _sort_by_quarter(ticker_data)
                     
-                    for _, row in ticker_data.iterrows():
-                        formatted_text += f"\n{row.get('QUARTER', 'N/A')}: {row.get('COMMENT', 'N/A')}\n"
+                    lines = '\n' + _text_col(ticker_data, 'QUARTER') + ': ' + _text_col(ticker_data, 'COMMENT') + '\n'
+                    formatted_text += lines.str.cat()
                 
-                all_qualitative_data.append(formatted_text)
+                out.new_block(formatted_text)
         
-        return "\n\n".join(all_qualitative_data)
+        return out.getvalue()
         
     except Exception as e:
-        print(f"Error in batch qualitative data collection: {str(e)}")
+        logger.error(f"Error in batch qualitative data collection: {str(e)}")
         # Fallback to original method
         return collect_qualitative_data(tickers, timeframe, qualitative_handler, need_components)
\ No newline at end of file
@@ -1,13 +1,172 @@
 #%% Import libraries
 import pandas as pd
+import numpy as np
 import os
+import logging
+from functools import lru_cache
 from typing import Dict, List, Any, Optional
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utilities.data_loader import load_table
+
+logger = logging.getLogger(__name__)
+
+_SECTOR_SET_UPPER = frozenset({'SECTOR', 'SOCB', 'PRIVATE_1', 'PRIVATE_2', 'PRIVATE_3'})
+_SUB_SECTOR_SET = frozenset({'SOCB', 'Private_1', 'Private_2', 'Private_3'})
+# Rule printed after each comment in the prompt text
+_SEP = "-" * 80
+
+
+@lru_cache(maxsize=4)
+def _load_excel(path: str, mtime: float) -> pd.DataFrame:
+    """
+    Load a workbook once per modification time through the shared load_table cache
+    (Parquet copy next to the xlsx), plus the handler's derived columns
+    """
+    return _prepare_frame(load_table(path))
+
+
+def _prepare_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Derived columns, computed once per load: _TKR_U (uppercased ticker) and
+    _Q_ORD (chronological quarter number). The load_table frame is shared,
+    so they are added to a new frame rather than in place
+    """
+    derived = {}
+    if 'TICKER' in df.columns:
+        derived['_TKR_U'] = df['TICKER'].str.upper().astype('category')
+    if 'QUARTER' in df.columns:
+        quarter_ord = _quarter_ord(df['QUARTER'].cat.categories)
+        if quarter_ord is not None:
+            # Missing quarters (code -1) sort last, as they would in a string sort
+            quarter_ord = np.append(quarter_ord, np.iinfo(np.int16).max).astype('int16')
+            derived['_Q_ORD'] = quarter_ord[df['QUARTER'].cat.codes.to_numpy()]
+    return df.assign(**derived)
+
+
+def _quarter_ord(quarters: pd.Index) -> Optional[np.ndarray]:
+    """year * 4 + quarter for 'YYYY-Q#' or '#Qyy' labels (None if any label does not parse)"""
+    quarters = pd.Series(quarters, dtype=str)
+    long_form = quarters.str.extract(r'^(\d{4})-Q([1-4])$').apply(pd.to_numeric)
+    short_form = quarters.str.extract(r'^([1-4])Q(\d{2})$').apply(pd.to_numeric)
+    year = long_form[0].fillna(2000 + short_form[1])
+    quarter = long_form[1].fillna(short_form[0])
+    if year.isna().any() or quarter.isna().any():
+        return None
+    return (year * 4 + quarter - 1).to_numpy()
+
+
+def _text_col(df: pd.DataFrame, col: str) -> pd.Series:
+    """Column as text for vectorized formatting, rendered like an f-string ('' when missing)"""
+    if col not in df.columns:
+        return pd.Series('', index=df.index)
+    return df[col].astype(str).fillna('nan')
+
+
+def _file_mtime(path: str) -> Optional[float]:
+    """Modification time of a file, or None if it does not exist"""
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
 
 class QualitativeDataHandler:
     
     def __init__(self, data_dir: str = 'Data'):
         self.data_dir = data_dir
         self.comments_cache = None
+        self.analysis_cache = None
+        
+        # Source paths, resolved once; the caches are reloaded when a file's mtime changes
+        # (the handler lives in session state, while pages 8 and the generators rewrite the files)
+        self._comments_path = os.path.join(data_dir, 'banking_comments.xlsx')
+        self._analysis_path = os.path.join(data_dir, 'quarterly_analysis_results.xlsx')
+        self._comments_mtime = None
+        self._analysis_mtime = None
+        
+        # Lookups built from comments_cache on load
+        self._ticker_to_sector = {}
+        self._by_ticker = {}
+        self._by_sector = {}
+        self._all_banks = []
+        
+        # Per-handler memoization of lookups (keys use a tuple timeframe); cleared on reload
+        self._banking_comment_memo = lru_cache(maxsize=1024)(self._get_banking_comment)
+        self._format_memo = lru_cache(maxsize=1024)(self._format_qualitative_data)
+    
+    @property
+    def has_comments(self) -> bool:
+        """Whether banking_comments.xlsx exists"""
+        return os.path.exists(self._comments_path)
+    
+    def get_comments_df(self) -> Optional[pd.DataFrame]:
+        """banking_comments.xlsx, reloaded only when the file changes (None if the file is missing)"""
+        mtime = _file_mtime(self._comments_path)
+        if mtime != self._comments_mtime:
+            self._comments_mtime = mtime
+            self.comments_cache = None if mtime is None else _load_excel(self._comments_path, mtime)
+            self._build_indexes(self.comments_cache)
+            self._banking_comment_memo.cache_clear()
+            self._format_memo.cache_clear()
+        return self.comments_cache
+    
+    def _build_indexes(self, df: Optional[pd.DataFrame]):
+        """Group comment rows by ticker and by sector once, instead of scanning per ticker"""
+        self._ticker_to_sector = {}
+        self._by_ticker = {}
+        self._by_sector = {}
+        self._all_banks = []
+        if df is None or 'TICKER' not in df.columns:
+            return
+        
+        self._by_ticker = dict(list(df.groupby('TICKER', sort=False, observed=True)))
+        
+        # Individual banks: 3-letter tickers, excluding sub-sector aggregates
+        tickers = pd.Series(list(self._by_ticker))
+        self._all_banks = tickers[(tickers.str.len() == 3) & ~tickers.isin(_SUB_SECTOR_SET)].tolist()
+        
+        if 'SECTOR' in df.columns:
+            # First SECTOR value per ticker
+            first_rows = df.drop_duplicates('TICKER')
+            self._ticker_to_sector = dict(zip(first_rows['TICKER'], first_rows['SECTOR']))
+            
+            # Member rows of each sector (the sector's own aggregate rows excluded)
+            members = df[df['TICKER'].astype(object) != df['SECTOR'].astype(object)]
+            self._by_sector = dict(list(members.groupby('SECTOR', sort=False, observed=True)))
+    
+    def get_known_tickers(self) -> frozenset:
+        """Every TICKER value in the comments data"""
+        self.get_comments_df()
+        return frozenset(self._by_ticker)
+    
+    def is_sector_ticker(self, ticker: str) -> bool:
+        """Whether a ticker is a sector-level aggregate (its SECTOR is 'Sector')"""
+        self.get_comments_df()
+        return self._ticker_to_sector.get(ticker) == 'Sector'
+    
+    def get_sector_members(self, sector: str) -> List[str]:
+        """Tickers whose rows are tagged with this SECTOR, in order of first appearance"""
+        self.get_comments_df()
+        members = self._by_sector.get(sector)
+        return [] if members is None else members['TICKER'].unique().tolist()
+    
+    def get_sector_banks(self, sector: str) -> List[str]:
+        """Individual banks in a sector ('Sector' means every bank, not the sub-sector aggregates)"""
+        if sector == 'Sector':
+            self.get_comments_df()
+            return list(self._all_banks)
+        return self.get_sector_members(sector)
+    
+    def get_analysis_df(self) -> Optional[pd.DataFrame]:
+        """quarterly_analysis_results.xlsx, reloaded only when the file changes (None if the file is missing)"""
+        mtime = _file_mtime(self._analysis_path)
+        if mtime != self._analysis_mtime:
+            self._analysis_mtime = mtime
+            self.analysis_cache = None if mtime is None else _load_excel(self._analysis_path, mtime)
+        return self.analysis_cache
     
     def normalize_ticker(self, ticker: str) -> str:
         """Normalize ticker for case-insensitive matching"""
@@ -29,18 +188,22 @@ class QualitativeDataHandler:
         # Return mapped version if it exists, otherwise return uppercase
         return ticker_map.get(ticker_upper, ticker_upper)
     
+    @staticmethod
+    def _freeze_timeframe(timeframe):
+        """Hashable form of a timeframe list for memoization"""
+        return tuple(timeframe) if isinstance(timeframe, list) else timeframe
+    
     def get_banking_comment(self, ticker: str, timeframe: List[str]) -> Dict[str, Any]:
-        """Get banking comments for a specific bank/sector and timeframe"""
+        """Get banking comments for a specific bank/sector and timeframe (memoized; do not modify the result)"""
+        return self._banking_comment_memo(ticker, self._freeze_timeframe(timeframe))
+    
+    def _get_banking_comment(self, ticker: str, timeframe) -> Dict[str, Any]:
+        if isinstance(timeframe, tuple):
+            timeframe = list(timeframe)
         try:
-            # Load banking_comments.xlsx if not cached
-            if self.comments_cache is None:
-                comments_path = os.path.join(self.data_dir, 'banking_comments.xlsx')
-                if os.path.exists(comments_path):
-                    self.comments_cache = pd.read_excel(comments_path)
-                else:
-                    return {'found': False, 'error': 'banking_comments.xlsx not found'}
-            
-            df = self.comments_cache
+            df = self.get_comments_df()
+            if df is None:
+                return {'found': False, 'error': 'banking_comments.xlsx not found'}
             
             # Normalize ticker for case-insensitive matching
             normalized_ticker = self.normalize_ticker(ticker)
@@ -48,58 +211,89 @@ class QualitativeDataHandler:
             # Filter by ticker (case-insensitive)
             if normalized_ticker and 'TICKER' in df.columns:
                 # Try exact match first
-                df_filtered = df[df['TICKER'] == normalized_ticker]
+                df_filtered = self._by_ticker.get(normalized_ticker)
                 
                 # If no exact match, try case-insensitive match
-                if df_filtered.empty:
-                    df_filtered = df[df['TICKER'].str.upper() == normalized_ticker.upper()]
+                if df_filtered is None:
+                    df_filtered = df[df['_TKR_U'] == normalized_ticker.upper()]
                 
                 df = df_filtered
             
-            # Filter by timeframe (quarters)
-            if timeframe and 'QUARTER' in df.columns:
-                df = df[df['QUARTER'].isin(timeframe)]
-            
-            if df.empty:
-                return {
-                    'found': False,
-                    'message': f'No comments found for {ticker} in quarters {timeframe}'
-                }
-            
-            # Get the comments
-            comments = []
-            for _, row in df.iterrows():
-                comments.append({
-                    'ticker': row.get('TICKER', ''),
-                    'quarter': row.get('QUARTER', ''),
-                    'comment': row.get('COMMENT', ''),
-                    'generated_at': str(row.get('GENERATED_AT', ''))
-                })
-            
-            return {
-                'found': True,
-                'comments': comments,
-                'count': len(comments)
-            }
+            return self._comments_from_rows(ticker, timeframe, df)
             
         except Exception as e:
             return {'found': False, 'error': str(e)}
     
-    def format_qualitative_data(self, ticker: str, timeframe: List[str], is_sector: bool = False) -> str:
-        """Format qualitative data for OpenAI prompt - uses banking_comments for all entities"""
+    def _comments_from_rows(self, ticker: str, timeframe: List[str], df: pd.DataFrame) -> Dict[str, Any]:
+        """Comment records for one ticker's rows within the timeframe"""
+        # Filter by timeframe (quarters)
+        if timeframe and 'QUARTER' in df.columns:
+            df = df[df['QUARTER'].isin(timeframe)]
         
-        # Normalize ticker for comparison
-        normalized_ticker = self.normalize_ticker(ticker)
+        if df.empty:
+            return {
+                'found': False,
+                'message': f'No comments found for {ticker} in quarters {timeframe}'
+            }
         
-        # List of sector tickers (case-insensitive check)
-        sector_tickers = ['Sector', 'SOCB', 'Private_1', 'Private_2', 'Private_3']
-        sector_tickers_upper = [s.upper() for s in sector_tickers]
+        # Get the comments (column lists instead of a Series per row)
+        def column(name):
+            return df[name].tolist() if name in df.columns else [''] * len(df)
         
-        # Determine if it's a sector (case-insensitive)
-        is_sector_ticker = normalized_ticker.upper() in sector_tickers_upper
+        comments = [
+            {'ticker': t, 'quarter': q, 'comment': c, 'generated_at': str(g)}
+            for t, q, c, g in zip(column('TICKER'), column('QUARTER'),
+                                  column('COMMENT'), column('GENERATED_AT'))
+        ]
+        
+        return {
+            'found': True,
+            'comments': comments,
+            'count': len(comments)
+        }
+    
+    def get_ticker_rows(self, ticker: str) -> Optional[pd.DataFrame]:
+        """All comment rows whose TICKER exactly matches the normalized ticker (None if there are none)"""
+        self.get_comments_df()
+        return self._by_ticker.get(self.normalize_ticker(ticker))
+    
+    def format_qualitative_data(self, ticker: str, timeframe: List[str], is_sector: bool = False,
+                                rows_df: Optional[pd.DataFrame] = None, out=None) -> str:
+        """
+        Format qualitative data for OpenAI prompt - uses banking_comments for all entities
+        
+        rows_df: the ticker's rows from get_ticker_rows, if the caller already has them;
+        they are formatted directly instead of looking the ticker up again
+        out: optional text buffer (anything with .write) that also receives the text
+        """
+        if rows_df is not None:
+            try:
+                result = self._comments_from_rows(ticker, timeframe, rows_df)
+            except Exception as e:
+                result = {'found': False, 'error': str(e)}
+            formatted = self._format_result(ticker, timeframe, is_sector, result)
+        else:
+            formatted = self._format_memo(ticker, self._freeze_timeframe(timeframe), is_sector)
+        
+        if out is not None:
+            out.write(formatted)
+        return formatted
+    
+    def _format_qualitative_data(self, ticker: str, timeframe, is_sector: bool) -> str:
+        if isinstance(timeframe, tuple):
+            timeframe = list(timeframe)
         
         # Always use banking_comments for both individual banks and sectors
         result = self.get_banking_comment(ticker, timeframe)
+        return self._format_result(ticker, timeframe, is_sector, result)
+    
+    def _format_result(self, ticker: str, timeframe: List[str], is_sector: bool, result: Dict[str, Any]) -> str:
+        """Prompt text for a get_banking_comment-style result"""
+        # Normalize ticker for comparison
+        normalized_ticker = self.normalize_ticker(ticker)
+        
+        # Determine if it's a sector (case-insensitive)
+        is_sector_ticker = normalized_ticker.upper() in _SECTOR_SET_UPPER
         
         if result['found']:
             # Determine entity type for formatting
@@ -108,11 +302,57 @@ class QualitativeDataHandler:
             # Use the normalized ticker for display
             display_ticker = normalized_ticker if normalized_ticker else ticker
             
-            formatted = f"{entity_type} ANALYSIS FOR {display_ticker}:\n\n"
+            parts = [f"{entity_type} ANALYSIS FOR {display_ticker}:\n\n"]
             for comment in result['comments']:
-                formatted += f"Quarter: {comment['quarter']}\n"
-                formatted += f"Analysis:\n{comment['comment']}\n"
-                formatted += "-" * 80 + "\n\n"
-            return formatted
+                parts.append(f"Quarter: {comment['quarter']}\nAnalysis:\n{comment['comment']}\n{_SEP}\n\n")
+            return "".join(parts)
         else:
-            return f"No analysis available for {ticker} in quarters: {timeframe}"
\ No newline at end of file
+            return f"No analysis available for {ticker} in quarters: {timeframe}"
+    
+    def format_qualitative_data_batch(self, tickers: List[str], timeframe: List[str]) -> Dict[str, str]:
+        """
+        Format qualitative data for several tickers with one filter and groupby pass
+        
+        Returns a dict of ticker -> formatted text (same text as format_qualitative_data),
+        with sector tickers detected from the SECTOR column
+        """
+        tickers = list(dict.fromkeys(tickers))
+        normalized = {t: self.normalize_ticker(t) for t in tickers}
+        
+        try:
+            df = self.get_comments_df()
+            
+            if df is None or 'TICKER' not in df.columns:
+                return {t: f"No analysis available for {t} in quarters: {timeframe}" for t in tickers}
+            
+            # One pass: every requested ticker (case-insensitive) within the timeframe
+            ticker_upper = df['_TKR_U']
+            mask = ticker_upper.isin({n.upper() for n in normalized.values() if n})
+            if timeframe and 'QUARTER' in df.columns:
+                mask &= df['QUARTER'].isin(timeframe)
+            groups = dict(list(df[mask].groupby(ticker_upper[mask], sort=False, observed=True)))
+            
+        except Exception:
+            return {t: f"No analysis available for {t} in quarters: {timeframe}" for t in tickers}
+        
+        results = {}
+        for ticker in tickers:
+            normalized_ticker = normalized[ticker]
+            rows = groups.get(normalized_ticker.upper()) if normalized_ticker else None
+            # Exact ticker matches take precedence over case-insensitive ones
+            if rows is not None and normalized_ticker in self._by_ticker:
+                rows = rows[rows['TICKER'] == normalized_ticker]
+            
+            if rows is None or rows.empty:
+                results[ticker] = f"No analysis available for {ticker} in quarters: {timeframe}"
+                continue
+            
+            is_sector = (normalized_ticker.upper() in _SECTOR_SET_UPPER
+                         or self.is_sector_ticker(ticker))
+            entity_type = "SECTOR" if is_sector else "BANK"
+            
+            blocks = ('Quarter: ' + _text_col(rows, 'QUARTER') + '\nAnalysis:\n'
+                      + _text_col(rows, 'COMMENT') + '\n' + '-' * 80 + '\n\n')
+            results[ticker] = f"{entity_type} ANALYSIS FOR {normalized_ticker}:\n\n" + blocks.str.cat()
+        
+        return results
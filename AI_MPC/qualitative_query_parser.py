@@ -1,26 +1,28 @@
 #%% Import libraries
 import json
-from typing import Dict, List, Any
+import re
+from typing import Dict, List, Any, Optional, Set
 
-def parse_qualitative_query(user_question: str, client, latest_quarter: str, latest_4_quarters: List[str]) -> Dict[str, Any]:
-    """
-    Parse a qualitative banking question to extract tickers, timeframe, and valuation flag
-    
-    Args:
-        user_question: The user's question
-        client: OpenAI client instance
-        latest_quarter: The latest available quarter string
-        latest_4_quarters: List of the latest 4 quarters
-    
-    Returns:
-        Dictionary with parsed information:
-        - tickers: List of bank codes or sector names
-        - timeframe: List of quarters
-        - has_sectors: Boolean indicating if sectors are mentioned
-        - valuation: Boolean indicating if valuation metrics are needed
-    """
-    
-    parse_prompt = f"""
+# Explicit tickers/quarters that can be extracted without the model
+_TICKER_RE = re.compile(r'\b([A-Z]{3}|Sector|SOCB|Private_[123])\b')
+_QUARTER_RE = re.compile(r'\b(?:([1-4])Q(\d{2})|(\d{4})-?Q([1-4]))\b')
+# Other period forms (1H25, FY24, 9M24, Q2 2025, a bare year) are left to the model
+_OTHER_PERIOD_RE = re.compile(
+    r'\b(?:[12]H\d{2,4}|H[12]\s*\d{2,4}|FY\s*\d{2,4}|\d{1,2}M\d{2,4}|Q[1-4]\s*\d{2,4})\b|'
+    r'\b(?:19|20)\d{2}\b(?!-?Q)',
+    re.IGNORECASE
+)
+# Wording that needs the model to decide valuation / need_components / relative timeframes
+_AMBIGUOUS_RE = re.compile(
+    r'compar|\bvs\.?\b|versus|within|among|rank|best|worst|which|\btop\b|perform|\bone\b|'
+    r'valuation|\bP/?[EB]\b|metric|multiple|cheap|expensive|invest|recommend|\bbuy\b|\bsell\b|'
+    r'latest|current|recent|last|since|trend|\bto\b|through|between',
+    re.IGNORECASE
+)
+_SECTOR_TICKERS = frozenset({'Sector', 'SOCB', 'Private_1', 'Private_2', 'Private_3'})
+
+# Prompt body is constant apart from the question and the quarter defaults
+_PARSE_PROMPT_TMPL = """
 Analyze this qualitative banking question and extract:
 1. TICKERS: List ALL bank codes or sector names mentioned. Valid sectors are:
    - Sector (overall banking sector)
@@ -51,6 +53,90 @@ Return JSON: {{"tickers": [...], "timeframe": [...], "has_sectors": true/false,
 
 
 """
+
+# Structured output schema for the parse call, built once
+_PARSE_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "qualitative_query",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "tickers": {"type": "array", "items": {"type": "string"}},
+                "timeframe": {"type": "array", "items": {"type": "string"}},
+                "has_sectors": {"type": "boolean"},
+                "valuation": {"type": "boolean"},
+                "need_components": {"type": "boolean"}
+            },
+            "required": ["tickers", "timeframe", "has_sectors", "valuation", "need_components"],
+            "additionalProperties": False
+        }
+    }
+}
+
+def _parse_with_regex(user_question: str, known_tickers: Set[str]) -> Optional[Dict[str, Any]]:
+    """
+    Parse questions that name known bank tickers and explicit quarters only (None if ambiguous)
+    Sector questions, unparsed period forms and valuation/comparison wording go to the model
+    """
+    if _AMBIGUOUS_RE.search(user_question) or _OTHER_PERIOD_RE.search(user_question):
+        return None
+    
+    tickers = list(dict.fromkeys(_TICKER_RE.findall(user_question)))
+    quarter_matches = _QUARTER_RE.findall(user_question)
+    if not tickers or not quarter_matches or not set(tickers) <= known_tickers:
+        return None
+    # need_components depends on how a sector question is worded, which only the model decides
+    if any(t in _SECTOR_TICKERS for t in tickers):
+        return None
+    
+    timeframe = []
+    for q_short, yy, yyyy, q_long in quarter_matches:
+        quarter = f"20{yy}-Q{q_short}" if q_short else f"{yyyy}-Q{q_long}"
+        if quarter not in timeframe:
+            timeframe.append(quarter)
+    
+    return {
+        'tickers': tickers,
+        'timeframe': timeframe,
+        'has_sectors': False,
+        'valuation': False,
+        'need_components': False
+    }
+
+
+def parse_qualitative_query(user_question: str, client, latest_quarter: str, latest_4_quarters: List[str],
+                            known_tickers: Optional[Set[str]] = None) -> Dict[str, Any]:
+    """
+    Parse a qualitative banking question to extract tickers, timeframe, and valuation flag
+    
+    Args:
+        user_question: The user's question
+        client: OpenAI client instance
+        latest_quarter: The latest available quarter string
+        latest_4_quarters: List of the latest 4 quarters
+        known_tickers: Tickers present in the comments data; when given, simple questions
+                       naming only these tickers and explicit quarters skip the OpenAI call
+    
+    Returns:
+        Dictionary with parsed information:
+        - tickers: List of bank codes or sector names
+        - timeframe: List of quarters
+        - has_sectors: Boolean indicating if sectors are mentioned
+        - valuation: Boolean indicating if valuation metrics are needed
+    """
+    
+    if known_tickers:
+        parsed = _parse_with_regex(user_question, known_tickers)
+        if parsed is not None:
+            return parsed
+    
+    parse_prompt = _PARSE_PROMPT_TMPL.format_map({
+        'user_question': user_question,
+        'latest_quarter': latest_quarter,
+        'latest_4_quarters': latest_4_quarters
+    })
     
     parse_response = client.chat.completions.create(
         model="gpt-4o",
@@ -59,7 +145,7 @@ Return JSON: {{"tickers": [...], "timeframe": [...], "has_sectors": true/false,
             {"role": "user", "content": parse_prompt}
         ],
         temperature=0,
-        response_format={"type": "json_object"}
+        response_format=_PARSE_RESPONSE_FORMAT
     )
     
     parsed = json.loads(parse_response.choices[0].message.content)
@@ -7,6 +7,7 @@ from typing import Dict, List, Any, Optional
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utilities.openai_utils import get_openai_client
 from utilities.quarter_utils import quarter_to_numeric
+from utilities.data_loader import load_table
 
 class QueryRouter:
     
@@ -21,7 +22,8 @@ class QueryRouter:
             current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
             key_items_path = os.path.join(current_dir, 'Data', 'Key_items.xlsx')
             
-            df = pd.read_excel(key_items_path)
+            # Parquet copy of the sheet when available, parsed once per process
+            df = load_table(key_items_path)
             
             # Create mapping: item name -> keycode
             mapping = {}
@@ -1,5 +1,73 @@
 #%% Import libraries
-from typing import Dict, Any
+import asyncio
+import os
+import weakref
+from typing import Dict, Any, List, Optional
+import openai
+
+# One AsyncOpenAI client (and HTTPX connection pool) per event loop; a client
+# cannot be reused once the loop it was first used on has closed
+_ASYNC_CLIENTS = weakref.WeakKeyDictionary()
+
+
+def get_async_client() -> openai.AsyncOpenAI:
+    """Shared AsyncOpenAI client for the running event loop"""
+    loop = asyncio.get_running_loop()
+    client = _ASYNC_CLIENTS.get(loop)
+    if client is None:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY not found in environment variables")
+        client = openai.AsyncOpenAI(api_key=api_key)
+        _ASYNC_CLIENTS[loop] = client
+    return client
+
+
+def _quantitative_messages(user_question: str, data_result: Dict[str, Any], valuation_data_text: str) -> List[Dict[str, str]]:
+    """Chat messages for the quantitative answer prompt"""
+    # Create prompt with question and data
+    enhanced_prompt = f"""
+Question: {user_question}
+
+Data Table:
+{data_result['data_table']}{valuation_data_text}
+
+Instructions:
+- Give a concise and punchy answer. If asked for data only provide the most relevant data.
+- Convert decimals to percentages (0.02 = 2%, 0.134 = 13.4%)
+- Round numbers appropriately (billions, millions, percentages to 1 decimal)
+- Be direct and specific with bank names and numbers
+"""
+    
+    return [
+        {"role": "system", "content": "You are a concise banking analyst. Give short, punchy answers with properly formatted numbers. Convert decimals to percentages, use billions/millions for large numbers. Maximum 2-3 sentences."},
+        {"role": "user", "content": enhanced_prompt}
+    ]
+
+
+def _qualitative_messages(user_question: str, qualitative_data: str, valuation_data_text: str) -> List[Dict[str, str]]:
+    """Chat messages for the qualitative answer prompt"""
+    # Create qualitative prompt
+    qual_prompt = f"""
+Question: {user_question}
+
+Available Analysis and Commentary:
+{qualitative_data}{valuation_data_text}
+
+Instructions:
+- Open with a concise conclusion of key findings, afterward followed with detailed analysis
+- Give a concise and punchy answer. If asked for data only provide the most relevant data.
+- Use specific examples and data points from the analysis
+- Convert decimals to percentages (0.02 = 2%, 0.134 = 13.4%)
+- Be punchy and assertive, max 2 paragraphs. Don't divert from the question
+- Reference specific quarters and banks when relevant
+"""
+    
+    return [
+        {"role": "system", "content": "You are a senior banking analyst writing comprehensive sector analysis. Draw insights from the provided commentary and analysis to answer questions with depth and nuance."},
+        {"role": "user", "content": qual_prompt}
+    ]
+
 
 def generate_quantitative_response(user_question: str, data_result: Dict[str, Any], valuation_data_text: str, 
                                   client, model: str, temperature: float) -> str:
@@ -18,26 +86,9 @@ def generate_quantitative_response(user_question: str, data_result: Dict[str, An
         Generated response string
     """
     
-    # Create prompt with question and data
-    enhanced_prompt = f"""
-Question: {user_question}
-
-Data Table:
-{data_result['data_table']}{valuation_data_text}
-
-Instructions:
-- Give a concise and punchy answer. If asked for data only provide the most relevant data.
-- Convert decimals to percentages (0.02 = 2%, 0.134 = 13.4%)
-- Round numbers appropriately (billions, millions, percentages to 1 decimal)
-- Be direct and specific with bank names and numbers
-"""
-    
     response = client.chat.completions.create(
         model=model,
-        messages=[
-            {"role": "system", "content": "You are a concise banking analyst. Give short, punchy answers with properly formatted numbers. Convert decimals to percentages, use billions/millions for large numbers. Maximum 2-3 sentences."},
-            {"role": "user", "content": enhanced_prompt}
-        ],
+        messages=_quantitative_messages(user_question, data_result, valuation_data_text),
         temperature=temperature
     )
     
@@ -61,29 +112,99 @@ def generate_qualitative_response(user_question: str, qualitative_data: str, val
         Generated response string
     """
     
-    # Create qualitative prompt
-    qual_prompt = f"""
-Question: {user_question}
+    response = client.chat.completions.create(
+        model=model,
+        messages=_qualitative_messages(user_question, qualitative_data, valuation_data_text),
+        temperature=temperature
+    )
+    
+    return response.choices[0].message.content
 
-Available Analysis and Commentary:
-{qualitative_data}{valuation_data_text}
 
-Instructions:
-- Open with a concise conclusion of key findings, afterward followed with detailed analysis
-- Give a concise and punchy answer. If asked for data only provide the most relevant data.
-- Use specific examples and data points from the analysis
-- Convert decimals to percentages (0.02 = 2%, 0.134 = 13.4%)
-- Be punchy and assertive, max 2 paragraphs. Don't divert from the question
-- Reference specific quarters and banks when relevant
-"""
+async def generate_quantitative_response_async(user_question: str, data_result: Dict[str, Any],
+                                               valuation_data_text: str, model: str, temperature: float,
+                                               client: Optional[openai.AsyncOpenAI] = None) -> str:
+    """
+    Async variant of generate_quantitative_response
     
-    response = client.chat.completions.create(
+    Args:
+        user_question: The user's question
+        data_result: Dictionary containing the data table
+        valuation_data_text: Formatted valuation data (if applicable)
+        model: Model name to use
+        temperature: Temperature setting for response
+        client: AsyncOpenAI client instance (defaults to the shared client)
+    
+    Returns:
+        Generated response string
+    """
+    
+    response = await (client or get_async_client()).chat.completions.create(
+        model=model,
+        messages=_quantitative_messages(user_question, data_result, valuation_data_text),
+        temperature=temperature
+    )
+    
+    return response.choices[0].message.content
+
+
+async def generate_qualitative_response_async(user_question: str, qualitative_data: str,
+                                              valuation_data_text: str, model: str, temperature: float,
+                                              client: Optional[openai.AsyncOpenAI] = None) -> str:
+    """
+    Async variant of generate_qualitative_response
+    
+    Args:
+        user_question: The user's question
+        qualitative_data: Combined qualitative data for all tickers
+        valuation_data_text: Formatted valuation data (if applicable)
+        model: Model name to use
+        temperature: Temperature setting for response
+        client: AsyncOpenAI client instance (defaults to the shared client)
+    
+    Returns:
+        Generated response string
+    """
+    
+    response = await (client or get_async_client()).chat.completions.create(
         model=model,
-        messages=[
-            {"role": "system", "content": "You are a senior banking analyst writing comprehensive sector analysis. Draw insights from the provided commentary and analysis to answer questions with depth and nuance."},
-            {"role": "user", "content": qual_prompt}
-        ],
+        messages=_qualitative_messages(user_question, qualitative_data, valuation_data_text),
         temperature=temperature
     )
     
-    return response.choices[0].message.content
\ No newline at end of file
+    return response.choices[0].message.content
+
+
+async def generate_responses_batch(requests: List[Dict[str, Any]], model: str, temperature: float,
+                                   client: Optional[openai.AsyncOpenAI] = None) -> List[Any]:
+    """
+    Generate several responses concurrently
+    
+    Args:
+        requests: List of dicts with 'type' ('quantitative' or 'qualitative') and the
+                  keyword arguments of the matching generate_*_response function
+                  (user_question, data_result/qualitative_data, valuation_data_text)
+        model: Model name to use
+        temperature: Temperature setting for response
+        client: AsyncOpenAI client instance (defaults to the shared client)
+    
+    Returns:
+        Responses in request order (an Exception in place of any failed request)
+    """
+    generators = {
+        'quantitative': generate_quantitative_response_async,
+        'qualitative': generate_qualitative_response_async
+    }
+    
+    # All requests share one client, so they reuse its connection pool
+    client = client or get_async_client()
+    tasks = [
+        generators[request['type']](
+            client=client,
+            model=model,
+            temperature=temperature,
+            **{k: v for k, v in request.items() if k != 'type'}
+        )
+        for request in requests
+    ]
+    return await asyncio.gather(*tasks, return_exceptions=True)
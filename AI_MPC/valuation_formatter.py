@@ -1,9 +1,66 @@
 #%% Import libraries
+from functools import lru_cache
 from typing import List, Optional
+import numpy as np
+import pandas as pd
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utilities.valuation_tool import calculate_valuation_metrics
+from utilities.data_loader import load_table
+
+_SECTOR_SET = frozenset({'Sector', 'SOCB', 'Private_1', 'Private_2', 'Private_3'})
+
+# Title block that starts the formatted text (returned alone it means no data)
+_HEADER = "\n\n" + "="*60 + "\nVALUATION METRICS\n" + "="*60 + "\n"
+
+# Columns used by format_valuation_data_batch
+_VALUATION_COLS = ['TICKER', 'Type', 'TRADE_DATE', 'PX_TO_BOOK_RATIO', 'PE_RATIO']
+
+# (label, metrics key) rows of the formatted text, shared by both formatters
+_HIST_1Y_FIELDS = (
+    ('P/B 1Y CDF', 'pb_1y_cdf'),
+    ('P/B 1Y Z-score', 'pb_1y_zscore'),
+    ('P/E 1Y CDF', 'pe_1y_cdf'),
+    ('P/E 1Y Z-score', 'pe_1y_zscore'),
+)
+_HIST_FULL_FIELDS = (
+    ('P/B Full CDF', 'pb_full_cdf'),
+    ('P/B Full Z-score', 'pb_full_zscore'),
+    ('P/E Full CDF', 'pe_full_cdf'),
+    ('P/E Full Z-score', 'pe_full_zscore'),
+)
+_SECTOR_FIELDS = (
+    ('Sector P/B', 'sector_pb'),
+    ('Sector P/E', 'sector_pe'),
+    ('Sector P/B 1Y CDF', 'sector_pb_1y_cdf'),
+    ('Sector P/B 1Y Z-score', 'sector_pb_1y_zscore'),
+    ('Sector P/B Full CDF', 'sector_pb_full_cdf'),
+    ('Sector P/B Full Z-score', 'sector_pb_full_zscore'),
+    ('Sector P/E 1Y CDF', 'sector_pe_1y_cdf'),
+    ('Sector P/E 1Y Z-score', 'sector_pe_1y_zscore'),
+    ('Sector P/E Full CDF', 'sector_pe_full_cdf'),
+    ('Sector P/E Full Z-score', 'sector_pe_full_zscore'),
+)
+
+
+def _field_lines(metrics: dict, fields) -> str:
+    return "".join(f"- {label}: {metrics.get(key, 'N/A')}\n" for label, key in fields)
+
+
+def _render(ticker: str, metrics: dict, with_sector: bool = True) -> str:
+    """Valuation text block for one ticker (current P/B and P/E must be present)"""
+    text = (f"\n{'='*40}\n[{ticker}] VALUATION DATA\n{'='*40}\n\n"
+            f"{ticker} Current Metrics:\n"
+            f"- Current P/B: {metrics['current_pb']}\n"
+            f"- Current P/E: {metrics['current_pe']}\n\n"
+            f"{ticker} Historical Position (1 Year):\n{_field_lines(metrics, _HIST_1Y_FIELDS)}\n"
+            f"{ticker} Historical Position (Full History):\n{_field_lines(metrics, _HIST_FULL_FIELDS)}")
+    if with_sector:
+        text += (f"\n{ticker} vs Sector ({metrics.get('sector', 'N/A')}) Comparison:\n"
+                 f"{_field_lines(metrics, _SECTOR_FIELDS)}")
+    return text
+
 
 def format_valuation_data(tickers: List[str]) -> str:
     """
@@ -15,49 +72,71 @@ def format_valuation_data(tickers: List[str]) -> str:
     Returns:
         Formatted string with valuation metrics
     """
-    valuation_data_text = "\n\n" + "="*60 + "\nVALUATION METRICS\n" + "="*60 + "\n"
+    parts = [_HEADER]
     
     for ticker in tickers:
         try:
             val_metrics = calculate_valuation_metrics(ticker)
             if 'error' not in val_metrics:
-                valuation_data_text += f"""
-{"="*40}
-[{ticker}] VALUATION DATA
-{"="*40}
-
-{ticker} Current Metrics:
-- Current P/B: {val_metrics['current_pb']}
-- Current P/E: {val_metrics['current_pe']}
-
-{ticker} Historical Position (1 Year):
-- P/B 1Y CDF: {val_metrics.get('pb_1y_cdf', 'N/A')}
-- P/B 1Y Z-score: {val_metrics.get('pb_1y_zscore', 'N/A')}
-- P/E 1Y CDF: {val_metrics.get('pe_1y_cdf', 'N/A')}
-- P/E 1Y Z-score: {val_metrics.get('pe_1y_zscore', 'N/A')}
-
-{ticker} Historical Position (Full History):
-- P/B Full CDF: {val_metrics.get('pb_full_cdf', 'N/A')}
-- P/B Full Z-score: {val_metrics.get('pb_full_zscore', 'N/A')}
-- P/E Full CDF: {val_metrics.get('pe_full_cdf', 'N/A')}
-- P/E Full Z-score: {val_metrics.get('pe_full_zscore', 'N/A')}
-
-{ticker} vs Sector ({val_metrics.get('sector', 'N/A')}) Comparison:
-- Sector P/B: {val_metrics.get('sector_pb', 'N/A')}
-- Sector P/E: {val_metrics.get('sector_pe', 'N/A')}
-- Sector P/B 1Y CDF: {val_metrics.get('sector_pb_1y_cdf', 'N/A')}
-- Sector P/B 1Y Z-score: {val_metrics.get('sector_pb_1y_zscore', 'N/A')}
-- Sector P/B Full CDF: {val_metrics.get('sector_pb_full_cdf', 'N/A')}
-- Sector P/B Full Z-score: {val_metrics.get('sector_pb_full_zscore', 'N/A')}
-- Sector P/E 1Y CDF: {val_metrics.get('sector_pe_1y_cdf', 'N/A')}
-- Sector P/E 1Y Z-score: {val_metrics.get('sector_pe_1y_zscore', 'N/A')}
-- Sector P/E Full CDF: {val_metrics.get('sector_pe_full_cdf', 'N/A')}
-- Sector P/E Full Z-score: {val_metrics.get('sector_pe_full_zscore', 'N/A')}
-"""
+                parts.append(_render(ticker, val_metrics))
         except:
             pass
     
-    return valuation_data_text if valuation_data_text != "\n\n" + "="*60 + "\nVALUATION METRICS\n" + "="*60 + "\n" else ""
+    return "".join(parts) if len(parts) > 1 else ""
+
+
+@lru_cache(maxsize=4)
+def _load_valuation(path: str, mtime: float) -> pd.DataFrame:
+    """
+    Valuation data prepared once per process (keyed by CSV path and modification time):
+    the needed columns from load_table (Parquet copy of the CSV), with a datetime
+    TRADE_DATE and sorted by TICKER and date
+    """
+    df = load_table(path, columns=_VALUATION_COLS)
+    df = df.assign(TRADE_DATE=pd.to_datetime(df['TRADE_DATE']))
+    return df.sort_values(['TICKER', 'TRADE_DATE']).reset_index(drop=True)
+
+
+def _count_mean_std(values):
+    """
+    Count, mean and sample std (ddof=1) of a NaN-free float array, computed as
+    pandas does (sum / n, then two-pass variance) but without Series overhead
+    """
+    n = values.size
+    if n < 2:
+        return n, (values.sum() / n if n else np.nan), np.nan
+    mean = values.sum() / n
+    deviations = values - mean
+    return n, mean, np.sqrt((deviations * deviations).sum() / (n - 1))
+
+
+def _cdf_rank(sorted_values, value) -> float:
+    """Same as scipy.stats.percentileofscore(values, value, kind='rank') / 100 on pre-sorted values"""
+    if np.isnan(value):
+        return np.nan
+    left = np.searchsorted(sorted_values, value, side='left')
+    right = np.searchsorted(sorted_values, value, side='right')
+    return (left + right + (left < right)) * (50.0 / len(sorted_values)) / 100
+
+
+@lru_cache(maxsize=4)
+def _valuation_index(path: str, mtime: float):
+    """
+    Row positions of the cached valuation frame per TICKER and per Type,
+    and each ticker's sector (Type of its first row)
+    """
+    df = _load_valuation(path, mtime)
+    ticker_idx = df.groupby('TICKER', observed=True).indices
+    type_idx = df.groupby('Type', observed=True).indices
+    ticker_sectors = df.drop_duplicates('TICKER').set_index('TICKER')['Type'].astype(str).to_dict()
+    return ticker_idx, type_idx, ticker_sectors
+
+
+@lru_cache(maxsize=4)
+def _sector_daily(path: str, mtime: float) -> pd.DataFrame:
+    """Average P/B and P/E of each Type on each trade date, indexed by (Type, TRADE_DATE)"""
+    df = _load_valuation(path, mtime)
+    return df.groupby(['Type', 'TRADE_DATE'], observed=True)[['PX_TO_BOOK_RATIO', 'PE_RATIO']].mean().sort_index()
 
 
 def format_valuation_data_batch(tickers: List[str]) -> str:
@@ -74,157 +153,126 @@ def format_valuation_data_batch(tickers: List[str]) -> str:
     if not tickers:
         return ""
     
-    import pandas as pd
     from datetime import timedelta
-    from scipy import stats
     
-    valuation_data_text = "\n\n" + "="*60 + "\nVALUATION METRICS\n" + "="*60 + "\n"
+    parts = [_HEADER]
     
-    # Load data once
+    # Load data once (cached across calls; not modified below)
     data_path = 'Data/Valuation_banking.csv'
     try:
-        df = pd.read_csv(data_path)
-        df['TRADE_DATE'] = pd.to_datetime(df['TRADE_DATE'])
-        df = df.sort_values(['TICKER', 'TRADE_DATE'])
+        mtime = os.path.getmtime(data_path)
+        df = _load_valuation(data_path, mtime)
         
         # Get latest date
         latest_date = df['TRADE_DATE'].max()
+        trade_dates = df['TRADE_DATE'].to_numpy()
         one_year_ago = latest_date - timedelta(days=365)
         
-        # Process all tickers at once
-        results = {}
+        # Requested tickers (first occurrence order) with data: sectors by Type, banks by TICKER
+        ticker_idx, type_idx, ticker_sectors = _valuation_index(data_path, mtime)
+        sector_daily = _sector_daily(data_path, mtime)
+        requested = list(dict.fromkeys(tickers))
+        found = [t for t in requested if t in (type_idx if t in _SECTOR_SET else ticker_idx)]
+        positions = [(type_idx if t in _SECTOR_SET else ticker_idx)[t] for t in found]
+        value_cols = ['PX_TO_BOOK_RATIO', 'PE_RATIO']
         
-        for ticker in tickers:
-            # Determine if it's a sector or individual ticker
-            if ticker in ['Private_1', 'Private_2', 'Private_3', 'SOCB', 'Sector']:
-                filtered_df = df[df['Type'] == ticker].copy()
-            else:
-                filtered_df = df[df['TICKER'] == ticker].copy()
-            
-            if filtered_df.empty:
-                continue
-            
-            # Get current values
-            current_data = filtered_df[filtered_df['TRADE_DATE'] == latest_date]
-            if current_data.empty:
-                continue
-                
-            current_data = current_data.iloc[0]
-            current_pb = current_data['PX_TO_BOOK_RATIO']
-            current_pe = current_data['PE_RATIO']
-            
-            # Calculate metrics using vectorized operations
-            pb_1y = filtered_df[filtered_df['TRADE_DATE'] >= one_year_ago]['PX_TO_BOOK_RATIO'].dropna()
-            pb_full = filtered_df['PX_TO_BOOK_RATIO'].dropna()
-            pe_1y = filtered_df[filtered_df['TRADE_DATE'] >= one_year_ago]['PE_RATIO'].dropna()
-            pe_full = filtered_df['PE_RATIO'].dropna()
+        # Positional slices of every requested key stacked together, labelled by key
+        rows = df.iloc[np.concatenate(positions)] if positions else df.iloc[:0]
+        row_keys = np.repeat(np.array(found, dtype=object), [len(pos) for pos in positions])
+        
+        # Current values: first row (in TICKER order) on the latest date for each key
+        is_latest = (rows['TRADE_DATE'] == latest_date).to_numpy()
+        current = rows[is_latest].set_index(row_keys[is_latest])[value_cols]
+        current = current[~current.index.duplicated()]
+        
+        # mean/std/count and the sorted values of every key, for each window, in one groupby pass
+        in_1y = (rows['TRADE_DATE'] >= one_year_ago).to_numpy()
+        windows = {}
+        for window, window_rows, window_keys in (('1y', rows[in_1y], row_keys[in_1y]), ('full', rows, row_keys)):
+            grouped = window_rows.groupby(window_keys)
+            window_stats = grouped[value_cols].agg(['mean', 'std', 'count']).reindex(current.index)
+            window_values = {}
+            for key, idx in grouped.indices.items():
+                # NaN sorts last, so dropping it is a slice
+                window_values[key] = {}
+                for vc in value_cols:
+                    values = np.sort(window_rows[vc].to_numpy()[idx])
+                    window_values[key][vc] = values[:len(values) - np.isnan(values).sum()]
             
-            result = {
-                'ticker': ticker,
-                'current_pb': round(current_pb, 4),
-                'current_pe': round(current_pe, 4)
+            # Z-scores for all requested tickers at once
+            zscores = {
+                vc: (current[vc] - window_stats[(vc, 'mean')]) / window_stats[(vc, 'std')]
+                for vc in value_cols
             }
+            windows[window] = (window_stats, window_values, zscores)
+        
+        results = {}
+        
+        for ticker in requested:
+            if ticker not in current.index:
+                continue
             
-            # P/B metrics
-            if len(pb_1y) > 1:
-                result['pb_1y_cdf'] = round(stats.percentileofscore(pb_1y, current_pb, kind='rank') / 100, 4)
-                result['pb_1y_zscore'] = round((current_pb - pb_1y.mean()) / pb_1y.std() if pb_1y.std() > 0 else 0, 4)
-            
-            if len(pb_full) > 1:
-                result['pb_full_cdf'] = round(stats.percentileofscore(pb_full, current_pb, kind='rank') / 100, 4)
-                result['pb_full_zscore'] = round((current_pb - pb_full.mean()) / pb_full.std() if pb_full.std() > 0 else 0, 4)
+            current_pb = current.at[ticker, 'PX_TO_BOOK_RATIO']
+            current_pe = current.at[ticker, 'PE_RATIO']
             
-            # P/E metrics
-            if len(pe_1y) > 1:
-                result['pe_1y_cdf'] = round(stats.percentileofscore(pe_1y, current_pe, kind='rank') / 100, 4)
-                result['pe_1y_zscore'] = round((current_pe - pe_1y.mean()) / pe_1y.std() if pe_1y.std() > 0 else 0, 4)
+            result = {'ticker': ticker}
+            # Raw metric values, rounded together with one np.round call below
+            raw = {'current_pb': current_pb, 'current_pe': current_pe}
             
-            if len(pe_full) > 1:
-                result['pe_full_cdf'] = round(stats.percentileofscore(pe_full, current_pe, kind='rank') / 100, 4)
-                result['pe_full_zscore'] = round((current_pe - pe_full.mean()) / pe_full.std() if pe_full.std() > 0 else 0, 4)
+            # P/B and P/E metrics over each window (skipped with fewer than 2 values)
+            for prefix, vc, current_value in (('pb', 'PX_TO_BOOK_RATIO', current_pb), ('pe', 'PE_RATIO', current_pe)):
+                for window in ('1y', 'full'):
+                    window_stats, window_values, zscores = windows[window]
+                    if window_stats.at[ticker, (vc, 'count')] > 1:
+                        std = window_stats.at[ticker, (vc, 'std')]
+                        raw[f'{prefix}_{window}_cdf'] = _cdf_rank(window_values[ticker][vc], current_value)
+                        if std > 0:
+                            raw[f'{prefix}_{window}_zscore'] = zscores[vc][ticker]
+                        else:
+                            result[f'{prefix}_{window}_zscore'] = 0
             
             # Add sector comparison if it's an individual ticker
-            if ticker not in ['Private_1', 'Private_2', 'Private_3', 'SOCB', 'Sector']:
-                ticker_sector = df[df['TICKER'] == ticker]['Type'].iloc[0] if not df[df['TICKER'] == ticker].empty else None
+            if ticker not in _SECTOR_SET:
+                ticker_sector = ticker_sectors.get(ticker)
                 
                 if ticker_sector:
-                    sector_df = df[df['Type'] == ticker_sector].copy()
-                    sector_latest = sector_df[sector_df['TRADE_DATE'] == latest_date]
+                    # Only the sector's latest-date rows are materialized
+                    sector_pos = type_idx[ticker_sector]
+                    sector_latest = df.iloc[sector_pos[trade_dates[sector_pos] == latest_date]]
                     
                     if not sector_latest.empty:
                         sector_pb_current = sector_latest['PX_TO_BOOK_RATIO'].mean()
                         sector_pe_current = sector_latest['PE_RATIO'].mean()
                         
                         result['sector'] = ticker_sector
-                        result['sector_pb'] = round(sector_pb_current, 4)
-                        result['sector_pe'] = round(sector_pe_current, 4)
+                        raw['sector_pb'] = sector_pb_current
+                        raw['sector_pe'] = sector_pe_current
                         
-                        # Calculate sector metrics
-                        sector_1y = sector_df[sector_df['TRADE_DATE'] >= one_year_ago]
-                        sector_pb_1y = sector_1y.groupby('TRADE_DATE')['PX_TO_BOOK_RATIO'].mean().dropna()
-                        sector_pb_full = sector_df.groupby('TRADE_DATE')['PX_TO_BOOK_RATIO'].mean().dropna()
-                        sector_pe_1y = sector_1y.groupby('TRADE_DATE')['PE_RATIO'].mean().dropna()
-                        sector_pe_full = sector_df.groupby('TRADE_DATE')['PE_RATIO'].mean().dropna()
-                        
-                        if len(sector_pb_1y) > 1:
-                            result['sector_pb_1y_cdf'] = round(stats.percentileofscore(sector_pb_1y, sector_pb_current, kind='rank') / 100, 4)
-                            result['sector_pb_1y_zscore'] = round((sector_pb_current - sector_pb_1y.mean()) / sector_pb_1y.std() if sector_pb_1y.std() > 0 else 0, 4)
-                        
-                        if len(sector_pb_full) > 1:
-                            result['sector_pb_full_cdf'] = round(stats.percentileofscore(sector_pb_full, sector_pb_current, kind='rank') / 100, 4)
-                            result['sector_pb_full_zscore'] = round((sector_pb_current - sector_pb_full.mean()) / sector_pb_full.std() if sector_pb_full.std() > 0 else 0, 4)
-                        
-                        if len(sector_pe_1y) > 1:
-                            result['sector_pe_1y_cdf'] = round(stats.percentileofscore(sector_pe_1y, sector_pe_current, kind='rank') / 100, 4)
-                            result['sector_pe_1y_zscore'] = round((sector_pe_current - sector_pe_1y.mean()) / sector_pe_1y.std() if sector_pe_1y.std() > 0 else 0, 4)
-                        
-                        if len(sector_pe_full) > 1:
-                            result['sector_pe_full_cdf'] = round(stats.percentileofscore(sector_pe_full, sector_pe_current, kind='rank') / 100, 4)
-                            result['sector_pe_full_zscore'] = round((sector_pe_current - sector_pe_full.mean()) / sector_pe_full.std() if sector_pe_full.std() > 0 else 0, 4)
+                        # Calculate sector metrics from the cached daily sector averages
+                        sector_full = sector_daily.loc[ticker_sector]
+                        sector_1y = sector_full[sector_full.index >= one_year_ago]
+                        for prefix, vc, sector_current in (('pb', 'PX_TO_BOOK_RATIO', sector_pb_current),
+                                                           ('pe', 'PE_RATIO', sector_pe_current)):
+                            for window, window_df in (('1y', sector_1y), ('full', sector_full)):
+                                values = window_df[vc].to_numpy()
+                                values = values[~np.isnan(values)]
+                                count, mean, std = _count_mean_std(values)
+                                if count > 1:
+                                    raw[f'sector_{prefix}_{window}_cdf'] = _cdf_rank(np.sort(values), sector_current)
+                                    if std > 0:
+                                        raw[f'sector_{prefix}_{window}_zscore'] = (sector_current - mean) / std
+                                    else:
+                                        result[f'sector_{prefix}_{window}_zscore'] = 0
             
+            result.update(zip(raw, np.round(np.fromiter(raw.values(), dtype=np.float64, count=len(raw)), 4)))
             results[ticker] = result
         
         # Format results
         for ticker, metrics in results.items():
-            valuation_data_text += f"""
-{"="*40}
-[{ticker}] VALUATION DATA
-{"="*40}
-
-{ticker} Current Metrics:
-- Current P/B: {metrics['current_pb']}
-- Current P/E: {metrics['current_pe']}
-
-{ticker} Historical Position (1 Year):
-- P/B 1Y CDF: {metrics.get('pb_1y_cdf', 'N/A')}
-- P/B 1Y Z-score: {metrics.get('pb_1y_zscore', 'N/A')}
-- P/E 1Y CDF: {metrics.get('pe_1y_cdf', 'N/A')}
-- P/E 1Y Z-score: {metrics.get('pe_1y_zscore', 'N/A')}
-
-{ticker} Historical Position (Full History):
-- P/B Full CDF: {metrics.get('pb_full_cdf', 'N/A')}
-- P/B Full Z-score: {metrics.get('pb_full_zscore', 'N/A')}
-- P/E Full CDF: {metrics.get('pe_full_cdf', 'N/A')}
-- P/E Full Z-score: {metrics.get('pe_full_zscore', 'N/A')}
-"""
-            
-            if 'sector' in metrics:
-                valuation_data_text += f"""
-{ticker} vs Sector ({metrics.get('sector', 'N/A')}) Comparison:
-- Sector P/B: {metrics.get('sector_pb', 'N/A')}
-- Sector P/E: {metrics.get('sector_pe', 'N/A')}
-- Sector P/B 1Y CDF: {metrics.get('sector_pb_1y_cdf', 'N/A')}
-- Sector P/B 1Y Z-score: {metrics.get('sector_pb_1y_zscore', 'N/A')}
-- Sector P/B Full CDF: {metrics.get('sector_pb_full_cdf', 'N/A')}
-- Sector P/B Full Z-score: {metrics.get('sector_pb_full_zscore', 'N/A')}
-- Sector P/E 1Y CDF: {metrics.get('sector_pe_1y_cdf', 'N/A')}
-- Sector P/E 1Y Z-score: {metrics.get('sector_pe_1y_zscore', 'N/A')}
-- Sector P/E Full CDF: {metrics.get('sector_pe_full_cdf', 'N/A')}
-- Sector P/E Full Z-score: {metrics.get('sector_pe_full_zscore', 'N/A')}
-"""
+            parts.append(_render(ticker, metrics, with_sector='sector' in metrics))
         
     except Exception as e:
         print(f"Error in batch valuation processing: {str(e)}")
         return ""
     
-    return valuation_data_text if valuation_data_text != "\n\n" + "="*60 + "\nVALUATION METRICS\n" + "="*60 + "\n" else ""
\ No newline at end of file
+    return "".join(parts) if len(parts) > 1 else ""
\ No newline at end of file
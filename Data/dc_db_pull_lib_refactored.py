@@ -1,10 +1,25 @@
 #%%
+import importlib.util
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import pyodbc
+import numpy as np
 import pandas as pd
 from pathlib import Path
 import platform
 from typing import Dict, List, Optional
 
+# Optional Arrow-native ODBC driver; load_data falls back to pyodbc without it
+try:
+    import turbodbc
+    _HAS_TURBODBC = True
+except ImportError:
+    _HAS_TURBODBC = False
+
+# pyarrow is optional: without it full refreshes write CSV through pandas only
+_HAS_PYARROW = importlib.util.find_spec('pyarrow') is not None
+
 # Helper functions
 def get_base_path():
     # Use current directory (Data folder) regardless of OS
@@ -48,6 +63,7 @@ QUERY_CONFIG = {
         'date_format': 'date',
         'default_start_date': '2018-01-01'
     },
+    # Add a 'columns' list to any SELECT * entry to fetch only those columns (see build_query)
     'EVEBITDA': {
         'base_query': """SELECT * FROM SIL.W_F_IRIS_CALCULATE
                          WHERE DATE >= '2018-01-01'""",
@@ -89,20 +105,129 @@ BANK_QUERIES = {
     'Bank_NOTE': 'SELECT * FROM S_SPS_NOTE_BANK'
 }
 
+# Set to fetch every column of the bank tables instead of only those prepare_data uses
+BANK_SELECT_ALL = False
+
+# Columns prepare_data needs besides the mapped values; ENDDATE must stay in all three
+# tables so the merges still name the income statement's copy ENDDATE_x
+BANK_KEY_COLUMNS = ['TICKER', 'YEARREPORT', 'LENGTHREPORT', 'ENDDATE']
+
+# DWHCode prefixes (from 'IRIS KeyCodes - Bank.xlsx') of each bank table's value columns
+BANK_CODE_PREFIXES = {
+    'Bank_BALANCESHEET': ('BSA', 'BSB'),
+    'Bank_INCOMESTATEMENT': ('ISA', 'ISB'),
+    'Bank_NOTE': ('NOB',)
+}
+
+# Column types of the merged CSV files, as pandas infers them (dates stay text so the
+# dedupe keys compare the same way); files without an entry are read with pd.read_csv
+_STR, _F64 = 'string', 'float64'
+CSV_SCHEMAS = {
+    'FA_Q_FULL': {'KEYCODE': _STR, 'TICKER': _STR, 'DATE': _STR, 'VALUE': _F64},
+    'MARKET_CAP': {'PRIMARYSECID': _STR, 'CUR_MKT_CAP': _F64, 'TRADE_DATE': _STR},
+    'VALUATION': {'PRIMARYSECID': _STR, 'TRADE_DATE': _STR, 'PE_RATIO': _F64,
+                  'PX_TO_BOOK_RATIO': _F64, 'PX_TO_SALES_RATIO': _F64},
+    'FORECAST': {'KEYCODE': _STR, 'KEYCODENAME': _STR, 'ORGANCODE': _STR, 'TICKER': _STR,
+                 'DATE': 'int64', 'VALUE': _F64, 'RATING': _STR, 'FORECASTDATE': _STR},
+}
+
+# Rows requested per fetch round trip on pyodbc cursors
+FETCH_ARRAYSIZE = 50_000
+
 # Date format requirements:
 # - For quarterly data: 'YYYYQX' format (e.g., '2025Q2')
 # - For daily data: 'YYYY-MM-DD' format (e.g., '2025-07-15')
 
-def load_data(query: str) -> Optional[pd.DataFrame]:
-    """Load data from the database using the provided query."""
+# pyodbc connections must not be shared between threads, so each thread keeps its own
+_thread_local = threading.local()
+
+def _get_connection(reconnect: bool = False):
+    """Return this thread's pyodbc connection, opening it on first use (or when reconnect is set)."""
+    connection = getattr(_thread_local, 'connection', None)
+    if connection is not None and reconnect:
+        try:
+            connection.close()
+        except pyodbc.Error:
+            pass
+        connection = None
+    if connection is None:
+        connection = pyodbc.connect(DIAMOND_STR, autocommit=True)
+        _thread_local.connection = connection
+        print("Connection successful!")
+    return connection
+
+def _is_connection_error(error: pyodbc.Error) -> bool:
+    """SQLSTATE class 08 means the connection itself failed (dropped, timed out, ...)."""
+    return bool(error.args) and str(error.args[0]).startswith('08')
+
+def _read_sql_pyodbc(query: str) -> pd.DataFrame:
+    """Run the query on the shared connection, reconnecting once if it has gone stale."""
+    for attempt in range(2):
+        connection = _get_connection(reconnect=attempt > 0)
+        try:
+            cursor = connection.cursor()
+            cursor.arraysize = FETCH_ARRAYSIZE
+            cursor.execute(query)
+            columns = [column[0] for column in cursor.description]
+            rows = []
+            while True:
+                batch = cursor.fetchmany()
+                if not batch:
+                    break
+                rows.extend(batch)
+            cursor.close()
+            # coerce_float converts Decimal columns the same way pd.read_sql does
+            return pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+        except pyodbc.Error as e:
+            if attempt > 0 or not _is_connection_error(e):
+                raise
+            print(f"Connection lost, reconnecting: {e}")
+
+def _turbodbc_connect():
+    """Open a turbodbc connection that buffers results and reads strings as unicode."""
+    options = turbodbc.make_options(read_buffered_results=True, prefer_unicode=True)
+    return turbodbc.connect(connection_string=DIAMOND_STR, turbodbc_options=options)
+
+def _load_data_turbodbc(query: str) -> Optional[pd.DataFrame]:
+    """Fetch the query result as one Arrow table and convert it without per-cell Python objects."""
     try:
-        connection = pyodbc.connect(DIAMOND_STR)
+        connection = _turbodbc_connect()
         print("Connection successful!")
         
-        data = pd.read_sql(query, connection)
+        try:
+            cursor = connection.cursor()
+            cursor.execute(query)
+            table = cursor.fetchallarrow(strings_as_dictionary=True)
+        finally:
+            connection.close()
+        
+        data = table.to_pandas(split_blocks=True, self_destruct=True)
         print(f"Data loaded successfully. Shape: {data.shape}")
+        return data
         
-        connection.close()
+    except turbodbc.Error as e:
+        print(f"Database error: {e}")
+        return None
+    except Exception as e:
+        print(f"General error: {e}")
+        return None
+
+def load_data(query: str, engine: str = 'turbodbc') -> Optional[pd.DataFrame]:
+    """
+    Load data from the database using the provided query.
+    
+    Args:
+        query: SQL query to run
+        engine: 'turbodbc' for the Arrow fetch (used when turbodbc is installed)
+                or 'pyodbc' for batched cursor.fetchmany() reads on the shared
+                connection, built into a DataFrame with DataFrame.from_records
+    """
+    if engine == 'turbodbc' and _HAS_TURBODBC:
+        return _load_data_turbodbc(query)
+    
+    try:
+        data = _read_sql_pyodbc(query)
+        print(f"Data loaded successfully. Shape: {data.shape}")
         return data
         
     except pyodbc.Error as e:
@@ -112,6 +237,67 @@ def load_data(query: str) -> Optional[pd.DataFrame]:
         print(f"General error: {e}")
         return None
 
+def _iter_arrow_batches(query: str, batch_size: int):
+    """Yield the query result as pyarrow Tables of about batch_size rows each (turbodbc)."""
+    options = turbodbc.make_options(read_buffer_size=turbodbc.Rows(batch_size),
+                                    prefer_unicode=True)
+    connection = turbodbc.connect(connection_string=DIAMOND_STR, turbodbc_options=options)
+    try:
+        cursor = connection.cursor()
+        cursor.execute(query)
+        yield from cursor.fetcharrowbatches()
+    finally:
+        connection.close()
+
+def _iter_frame_batches(query: str, batch_size: int):
+    """Yield the query result as DataFrames of about batch_size rows each."""
+    if _HAS_TURBODBC and _HAS_PYARROW:
+        for table in _iter_arrow_batches(query, batch_size):
+            yield table.to_pandas()
+    else:
+        yield from pd.read_sql(query, _get_connection(), chunksize=batch_size)
+
+def load_data_streaming(query: str, out_path, batch_size: int = 100_000) -> Optional[int]:
+    """
+    Run a query and write its result to out_path as CSV batch by batch, so peak memory is one batch.
+    
+    Args:
+        query: SQL query to run
+        out_path: Output CSV file; replaced only once the whole result has been written
+        batch_size: Rows fetched and written per batch
+    
+    Returns:
+        Number of rows written, or None on error
+    """
+    out_path = Path(out_path)
+    tmp_path = out_path.with_name(out_path.name + '.tmp')
+    batches = 0
+    rows = 0
+    try:
+        # Same text format as the files written by to_csv and merge_and_deduplicate,
+        # so later incremental pulls dedupe against these rows
+        for chunk in _iter_frame_batches(query, batch_size):
+            chunk.to_csv(tmp_path, mode='a' if batches else 'w', header=not batches, index=False)
+            batches += 1
+            rows += len(chunk)
+        
+        if not batches:
+            print(f"No rows returned, {out_path} left unchanged")
+            return 0
+        os.replace(tmp_path, out_path)
+        print(f"Saved {rows} rows to {out_path}")
+        return rows
+        
+    except pyodbc.Error as e:
+        print(f"Database error: {e}")
+        return None
+    except Exception as e:
+        print(f"General error: {e}")
+        return None
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
 def to_csv(df: pd.DataFrame, file_name: str):
     """Export DataFrame to CSV directly to Data folder."""
     if df is None:
@@ -123,19 +309,99 @@ def to_csv(df: pd.DataFrame, file_name: str):
     df.to_csv(output_path, index=False)
     print(f"Saved to {output_path}")
 
+def _read_existing(csv_path: Path) -> pd.DataFrame:
+    """Read a merged file, from its Parquet copy when that is at least as new as the CSV."""
+    parquet_path = csv_path.with_suffix('.parquet')
+    if (parquet_path.exists() and csv_path.exists()
+            and parquet_path.stat().st_mtime >= csv_path.stat().st_mtime):
+        try:
+            return pd.read_parquet(parquet_path)
+        except Exception as e:
+            print(f"Could not read {parquet_path}, reading CSV instead: {e}")
+    
+    column_types = CSV_SCHEMAS.get(csv_path.stem)
+    if column_types is None or not _HAS_PYARROW or not csv_path.exists():
+        return pd.read_csv(csv_path)
+    
+    # Typed multithreaded parse instead of pandas re-inferring every column
+    try:
+        import pyarrow.csv as pa_csv
+        table = pa_csv.read_csv(csv_path, convert_options=pa_csv.ConvertOptions(
+            column_types=column_types, strings_can_be_null=True))
+    except Exception as e:
+        print(f"Typed read of {csv_path} failed, using pandas: {e}")
+        return pd.read_csv(csv_path)
+    return table.to_pandas()
+
+def _write_parquet_copy(df: pd.DataFrame, csv_path: Path):
+    """Keep a zstd Parquet copy next to the CSV (which stays the file the scripts read)."""
+    if not _HAS_PYARROW:
+        return
+    parquet_path = csv_path.with_suffix('.parquet')
+    try:
+        df.to_parquet(parquet_path, index=False, compression='zstd')
+    except Exception as e:
+        print(f"Could not write Parquet copy {parquet_path}: {e}")
+        parquet_path.unlink(missing_ok=True)
+
+def _fast_dedupe(df: pd.DataFrame, columns: List[str], keep: str = 'last',
+                 ignore_index: bool = False) -> pd.DataFrame:
+    """
+    Same result as df.drop_duplicates(subset=columns, keep=keep, ignore_index=ignore_index)
+    for keep='first'/'last', found by combining the factorized key columns into one int64
+    key instead of hashing a tuple of Python objects per row.
+    """
+    if keep not in ('first', 'last'):
+        raise ValueError(f"keep must be 'first' or 'last', got {keep!r}")
+    
+    key = np.zeros(len(df), dtype=np.int64)
+    span = 1
+    for col in columns:
+        codes, uniques = pd.factorize(df[col], use_na_sentinel=False)
+        cardinality = max(len(uniques), 1)
+        span *= cardinality
+        if span >= 2**62:
+            return df.drop_duplicates(subset=columns, keep=keep, ignore_index=ignore_index)
+        key = key * cardinality + codes
+    
+    mask = np.zeros(len(df), dtype=bool)
+    if keep == 'first':
+        mask[np.unique(key, return_index=True)[1]] = True
+    else:
+        # First occurrence in the reversed key array is the last occurrence in df
+        mask[len(df) - 1 - np.unique(key[::-1], return_index=True)[1]] = True
+    
+    result = df[mask]
+    return result.reset_index(drop=True) if ignore_index else result
+
 def merge_and_deduplicate(new_df: pd.DataFrame, existing_file_name: str, 
-                         dedupe_columns: List[str]) -> Optional[pd.DataFrame]:
-    """Merge new dataframe with existing CSV file and remove duplicates."""
+                         dedupe_columns: List[str], append_only: bool = False) -> Optional[pd.DataFrame]:
+    """
+    Merge new dataframe with existing CSV file and remove duplicates.
+    
+    With append_only, rows are appended to the CSV when its header matches new_df, skipping
+    the read/dedupe/rewrite of the whole file; run deduplicate_file afterwards to drop the
+    duplicates this leaves (the scripts reading these CSVs do not deduplicate).
+    """
     if new_df is None:
         print(f"Cannot merge {existing_file_name}: No new data available")
         return None
     
     try:
         existing_path = get_base_path() / f"{existing_file_name}.csv"
-        existing_df = pd.read_csv(existing_path)
+        if append_only and existing_path.exists():
+            existing_columns = pd.read_csv(existing_path, nrows=0).columns.tolist()
+            if existing_columns == list(new_df.columns):
+                new_df.to_csv(existing_path, mode='a', header=False, index=False)
+                print(f"Appended {len(new_df)} records to {existing_path} (not deduplicated)")
+                return new_df
+            print(f"Columns of {existing_path} differ from the new data, merging instead of appending")
+        
+        existing_df = _read_existing(existing_path)
         merged_df = pd.concat([existing_df, new_df], ignore_index=True)
-        final_df = merged_df.drop_duplicates(subset=dedupe_columns, keep='last')
+        final_df = _fast_dedupe(merged_df, dedupe_columns, keep='last', ignore_index=True)
         final_df.to_csv(existing_path, index=False)
+        _write_parquet_copy(final_df, existing_path)
         print(f"Merged and saved to {existing_path}")
         print(f"Previous records: {len(existing_df)}, New records: {len(new_df)}, Final records: {len(final_df)}")
         return final_df
@@ -144,9 +410,48 @@ def merge_and_deduplicate(new_df: pd.DataFrame, existing_file_name: str,
         to_csv(new_df, existing_file_name)
         return new_df
 
+def deduplicate_file(query_name: str) -> Optional[pd.DataFrame]:
+    """Drop duplicate rows (keeping the latest) from a CSV built up by append-only updates."""
+    if query_name not in QUERY_CONFIG:
+        print(f"Query {query_name} not found in configuration")
+        return None
+    
+    return merge_and_deduplicate(pd.DataFrame(), query_name, QUERY_CONFIG[query_name]['dedupe_columns'])
+
+def _select_columns(query: str, columns: List[str]) -> str:
+    """Replace the leading SELECT * of a query with an explicit column list."""
+    if not query.lstrip().upper().startswith('SELECT *'):
+        raise ValueError("Column lists need a query starting with SELECT *")
+    column_list = ', '.join(f'[{column}]' for column in columns)
+    return query.replace('*', column_list, 1)
+
+def build_bank_query(query_name: str, select_all: Optional[bool] = None) -> str:
+    """
+    Build a bank table query that fetches only the key columns and the DWH codes mapped
+    in 'IRIS KeyCodes - Bank.xlsx', the only columns prepare_data reads.
+    
+    Falls back to SELECT * when select_all (default BANK_SELECT_ALL) is set or the
+    mapping cannot be read.
+    """
+    query = BANK_QUERIES[query_name]
+    if BANK_SELECT_ALL if select_all is None else select_all:
+        return query
+    
+    try:
+        mapping = pd.read_excel(get_base_path() / 'IRIS KeyCodes - Bank.xlsx')
+    except Exception as e:
+        print(f"Could not read the bank code mapping, selecting all columns: {e}")
+        return query
+    
+    codes = mapping['DWHCode'].dropna().astype(str)
+    codes = codes[codes.str.startswith(BANK_CODE_PREFIXES[query_name])].unique().tolist()
+    return _select_columns(query, BANK_KEY_COLUMNS + codes)
+
 def build_query(config: Dict, incremental: bool = False, incremental_date: Optional[str] = None) -> str:
     """Build the appropriate query based on refresh type."""
     query = config['base_query']
+    if 'columns' in config:
+        query = _select_columns(query, config['columns'])
     
     if incremental and 'incremental_filter' in config and incremental_date:
         if config['date_format'] == 'quarter':
@@ -172,30 +477,40 @@ def full_refresh(query_name: str):
     if query_name in QUERY_CONFIG:
         config = QUERY_CONFIG[query_name]
         query = build_query(config, incremental=False)
-        df = load_data(query)
-        if df is not None:
-            to_csv(df, query_name)
+        load_data_streaming(query, get_base_path() / f"{query_name}.csv")
     else:
         print(f"Query {query_name} not found in configuration")
 
-def full_refresh_all():
-    """Perform full refresh for all configured queries."""
-    # Process configured queries
-    for query_name, config in QUERY_CONFIG.items():
-        print(f"\n{'='*60}")
-        print(f"Full refresh: {query_name}")
-        full_refresh(query_name)
+def _refresh_bank(query_name: str):
+    """Full refresh of one bank query into its mapped file name."""
+    file_name = BANK_FILE_MAPPING.get(query_name, query_name)
+    load_data_streaming(build_bank_query(query_name), get_base_path() / f"{file_name}.csv")
+
+def full_refresh_all(max_workers: int = 4):
+    """
+    Perform full refresh for all configured queries and bank queries.
+    
+    The queries are independent and mostly wait on the server, so up to max_workers
+    run at once; each worker thread reuses one connection for all of its queries.
+    Lower it if the server is the bottleneck.
+    """
+    jobs = [(query_name, full_refresh, (query_name,)) for query_name in QUERY_CONFIG]
+    # Bank queries are always full refresh
+    jobs += [(query_name, _refresh_bank, (query_name,)) for query_name in BANK_QUERIES]
     
-    # Process bank queries (always full refresh)
     print(f"\n{'='*60}")
-    print("Processing Bank Data")
-    for query_name, query in BANK_QUERIES.items():
-        df = load_data(query)
-        # Use mapped file name for bank data
-        file_name = BANK_FILE_MAPPING.get(query_name, query_name)
-        to_csv(df, file_name)
-
-def incremental_update(query_name: str, date_filter: str):
+    print(f"Full refresh: {len(jobs)} queries, up to {max_workers} at a time")
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs)))) as executor:
+        futures = {executor.submit(func, *args): query_name for query_name, func, args in jobs}
+        for future in as_completed(futures):
+            query_name = futures[future]
+            try:
+                future.result()
+                print(f"Finished: {query_name}")
+            except Exception as e:
+                print(f"Error refreshing {query_name}: {e}")
+
+def incremental_update(query_name: str, date_filter: str, append_only: bool = False):
     """
     Perform incremental update for a specific query.
     
@@ -204,6 +519,7 @@ def incremental_update(query_name: str, date_filter: str):
         date_filter: Date filter in appropriate format:
                     - For quarterly data: 'YYYYQX' (e.g., '2025Q2')
                     - For daily data: 'YYYY-MM-DD' (e.g., '2025-07-15')
+        append_only: Append the new rows without deduplicating (see merge_and_deduplicate)
     """
     if query_name not in QUERY_CONFIG:
         print(f"Query {query_name} not found in configuration")
@@ -216,7 +532,7 @@ def incremental_update(query_name: str, date_filter: str):
     df = load_data(query)
     
     if df is not None:
-        merge_and_deduplicate(df, query_name, config['dedupe_columns'])
+        merge_and_deduplicate(df, query_name, config['dedupe_columns'], append_only=append_only)
 
 def full_refresh_banks():
     """Perform full refresh for Bank data only."""
@@ -224,12 +540,9 @@ def full_refresh_banks():
     print("Processing Bank Data (Full Refresh)")
     print(f"{'='*60}")
     
-    for query_name, query in BANK_QUERIES.items():
+    for query_name in BANK_QUERIES:
         print(f"\nProcessing: {query_name}")
-        df = load_data(query)
-        # Use mapped file name for bank data
-        file_name = BANK_FILE_MAPPING.get(query_name, query_name)
-        to_csv(df, file_name)
+        _refresh_bank(query_name)
         
     print(f"\n{'='*60}")
     print("Bank data refresh completed!")
@@ -254,3 +567,8 @@ if __name__ == "__main__":
     # incremental_update('FA_Q_FULL', '2025Q2')      # Quarterly data for Q2 2025
     # incremental_update('MARKET_CAP', '2025-07-15')  # Daily data from this date
     
+    # 5. Several append-only updates, deduplicated once at the end
+    # incremental_update('VALUATION', '2025-07-15', append_only=True)
+    # incremental_update('VALUATION', '2025-07-16', append_only=True)
+    # deduplicate_file('VALUATION')
+    
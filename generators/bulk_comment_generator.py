@@ -9,7 +9,8 @@ import sys
 
 # Add parent directory to path for utilities import
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utilities.quarter_utils import quarter_to_numeric, quarter_sort_key
+from utilities.quarter_utils import quarter_to_numeric, quarters_to_numeric, quarter_sort_key
+from utilities.data_loader import load_table, keycode_maps
 
 # Load environment variables
 load_dotenv()
@@ -20,9 +21,11 @@ data_dir = os.path.join(project_root, 'Data')
 
 # Load data
 print("Loading data...")
-df_quarter = pd.read_csv(os.path.join(data_dir, 'dfsectorquarter.csv'))
-keyitem = pd.read_excel(os.path.join(data_dir, 'Key_items.xlsx'))
-bank_type_mapping = pd.read_excel(os.path.join(data_dir, 'Bank_Type.xlsx'))
+# TICKER/Type/Date_Quarter come back categorical, so the per-ticker masks compare codes
+df_quarter = load_table(os.path.join(data_dir, 'dfsectorquarter.csv'))
+# Static lookup sheets, read from their Parquet copies after the first run
+keyitem = load_table(os.path.join(data_dir, 'Key_items.xlsx'))
+bank_type_mapping = load_table(os.path.join(data_dir, 'Bank_Type.xlsx'))
 
 print(f"Bank Type mapping structure:")
 print(bank_type_mapping.head())
@@ -73,22 +76,21 @@ def openai_comment_bulk(ticker, sector, quarter, df_quarter_data, keyitem_data):
     """Modified version of openai_comment for bulk processing"""
     
     def get_data(ticker, sector, target_quarter):
-        cols_keep = pd.DataFrame({
-        'Name': [
+        cols_keep = [
             'Loan', 'TOI', 'Provision expense', 'PBT', 'ROA', 'ROE', 'NIM', 'Loan yield',
             'NPL', 'NPL Formation (%)', 'GROUP 2', 'G2 Formation (%)',
             'NPL Coverage ratio'
         ]
-        })
-        cols_code_keep = cols_keep.merge(keyitem_data, on='Name', how='left')
-        cols_keep_final = ['Date_Quarter'] + cols_code_keep['KeyCode'].tolist()
-        rename_dict = dict(zip(cols_code_keep['KeyCode'], cols_code_keep['Name']))
+        # Hash lookups instead of merging the Key_items table on every call
+        name_to_keycode, keycode_to_name = keycode_maps(keyitem_data)
+        cols_keep_final = ['Date_Quarter'] + name_to_keycode.reindex(cols_keep).dropna().tolist()
+        rename_dict = keycode_to_name.to_dict()
 
         # Helper functions for growth calculations
         def calculate_growth(df_data, period, suffix):
             """Calculate growth (%) and return formatted DataFrame."""
             growth = df_data.iloc[:, 1:].pct_change(periods=period)
-            growth.columns = growth.columns.map(rename_dict)
+            growth = growth.rename(columns=rename_dict)
             growth = growth.add_suffix(f' {suffix} (%)')
             return pd.concat([df_data['Date_Quarter'], growth], axis=1)
 
@@ -139,7 +141,7 @@ def openai_comment_bulk(ticker, sector, quarter, df_quarter_data, keyitem_data):
         # Sort by date and get data up to target quarter
         # Filter data up to target quarter
         target_numeric = quarter_to_numeric(target_quarter)
-        df_ticker['quarter_numeric'] = df_ticker['Date_Quarter'].apply(quarter_to_numeric)
+        df_ticker['quarter_numeric'] = quarters_to_numeric(df_ticker['Date_Quarter'])
         df_ticker = df_ticker[df_ticker['quarter_numeric'] <= target_numeric]
         df_ticker = df_ticker.sort_values('quarter_numeric')
         df_ticker = df_ticker.drop('quarter_numeric', axis=1)
@@ -178,14 +180,14 @@ def openai_comment_bulk(ticker, sector, quarter, df_quarter_data, keyitem_data):
         df_ticker_out = df_ticker_out[1:]
         
         # Get sector data (similar process)
-        df_sector = df_quarter_data[(df_quarter_data['Type'] == sector) & (df_quarter_data['TICKER'].apply(lambda t: len(t) > 3))]
+        df_sector = df_quarter_data[(df_quarter_data['Type'] == sector) & (df_quarter_data['TICKER'].str.len() > 3)]
         if not df_sector.empty:
             sector_ticker = df_sector['TICKER'].iloc[0]
             df_sector = df_sector[df_sector['TICKER'] == sector_ticker]
             df_sector = df_sector[cols_keep_final]
             
             # Filter data up to target quarter
-            df_sector['quarter_numeric'] = df_sector['Date_Quarter'].apply(quarter_to_numeric)
+            df_sector['quarter_numeric'] = quarters_to_numeric(df_sector['Date_Quarter'])
             df_sector = df_sector[df_sector['quarter_numeric'] <= target_numeric]
             df_sector = df_sector.sort_values('quarter_numeric')
             df_sector = df_sector.drop('quarter_numeric', axis=1)
@@ -8,10 +8,13 @@ Generates AI analysis for all quarters from 2024-Q1 to current and saves to Exce
 import pandas as pd
 import os
 import sys
+import json
 from datetime import datetime
 import openai
 from dotenv import load_dotenv
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Load environment variables
 load_dotenv()
@@ -22,7 +25,25 @@ sys.path.append(project_root)
 data_dir = os.path.join(project_root, 'Data')
 
 # Import utilities
-from utilities.quarter_utils import quarter_sort_key, sort_quarters
+from utilities.quarter_utils import sort_quarters
+from utilities.data_loader import load_table
+
+# Quarters analyzed concurrently, and the OpenAI request budget they share
+MAX_WORKERS = int(os.getenv("BULK_ANALYSIS_WORKERS", "4"))
+REQUESTS_PER_MINUTE = int(os.getenv("OPENAI_REQUESTS_PER_MINUTE", "20"))
+
+class RateLimiter:
+    """Token bucket shared by worker threads: at most `per_minute` requests in any 60 seconds"""
+    
+    def __init__(self, per_minute):
+        self._tokens = threading.Semaphore(per_minute)
+    
+    def acquire(self):
+        """Block until a request may be sent; the token comes back a minute later"""
+        self._tokens.acquire()
+        refill = threading.Timer(60, self._tokens.release)
+        refill.daemon = True
+        refill.start()
 
 class BulkQuarterlyAnalysisGenerator:
     def __init__(self):
@@ -31,8 +52,13 @@ class BulkQuarterlyAnalysisGenerator:
             raise ValueError("OPENAI_API_KEY not found in environment variables")
         
         self.client = openai.OpenAI(api_key=self.api_key)
+        self.rate_limiter = RateLimiter(REQUESTS_PER_MINUTE)
         self.comments_file = os.path.join(data_dir, "banking_comments.xlsx")
         self.analysis_file = os.path.join(data_dir, "quarterly_analysis_results.xlsx")
+        # Append-only progress log of a run; folded into the Excel file when the run ends
+        self.checkpoint_file = os.path.splitext(self.analysis_file)[0] + ".jsonl"
+        # Chronological order of the comment quarters, set by load_comments_data
+        self.quarter_order = []
         
         print(f"Comments file: {self.comments_file}")
         print(f"Analysis results will be saved to: {self.analysis_file}")
@@ -42,27 +68,22 @@ class BulkQuarterlyAnalysisGenerator:
         if not os.path.exists(self.comments_file):
             raise FileNotFoundError(f"Comments file not found: {self.comments_file}")
         
-        return pd.read_excel(self.comments_file)
+        # Cached per file version (Parquet copy when available); not modified by the generator
+        comments_df = load_table(self.comments_file, columns=['TICKER', 'SECTOR', 'QUARTER', 'COMMENT'])
+        self.quarter_order = sort_quarters(comments_df['QUARTER'].dropna().unique().tolist())
+        return comments_df
     
     def get_quarters_to_analyze(self, comments_df):
         """Get all quarters from 2024-Q1 onwards"""
         all_quarters = comments_df['QUARTER'].unique().tolist()
-        sorted_quarters = sort_quarters(all_quarters)
+        sorted_quarters = pd.Series(sort_quarters(all_quarters), dtype=object)
         
-        # Filter quarters from 2024-Q1 onwards
-        quarters_to_analyze = []
-        for quarter in sorted_quarters:
-            # Extract year from quarter (e.g., "2024-Q1" -> 2024)
-            if '-Q' in quarter:
-                year_part = quarter.split('-Q')[0]
-                try:
-                    year = int(year_part)
-                    if year >= 2024:  # 2024 onwards
-                        quarters_to_analyze.append(quarter)
-                except ValueError:
-                    continue
+        # Filter quarters from 2024-Q1 onwards: year before "-Q" (e.g., "2024-Q1" -> 2024),
+        # labels without a numeric year are skipped
+        is_quarter = sorted_quarters.str.contains('-Q', regex=False, na=False)
+        years = pd.to_numeric(sorted_quarters.str.split('-Q').str[0], errors='coerce')
         
-        return quarters_to_analyze
+        return sorted_quarters[is_quarter & (years >= 2024)].tolist()
     
     def load_existing_analysis(self):
         """Load existing analysis results if file exists"""
@@ -74,17 +95,35 @@ class BulkQuarterlyAnalysisGenerator:
                 return pd.DataFrame()
         return pd.DataFrame()
     
+    def load_checkpoint(self):
+        """Load results checkpointed by an unfinished run (empty list if none)"""
+        if not os.path.exists(self.checkpoint_file):
+            return []
+        try:
+            with open(self.checkpoint_file, encoding="utf-8") as f:
+                results = [json.loads(line) for line in f if line.strip()]
+            for result in results:
+                result['generated_date'] = pd.to_datetime(result['generated_date'])
+            return results
+        except Exception as e:
+            print(f"Error loading checkpoint file: {e}")
+            return []
+    
+    def append_checkpoint(self, result):
+        """Append one quarter's result to the checkpoint file"""
+        with open(self.checkpoint_file, "a", encoding="utf-8") as f:
+            f.write(json.dumps(result, default=str) + "\n")
+    
     def analyze_quarter(self, quarter_comments_df, quarter):
         """Analyze a single quarter using ChatGPT"""
         try:
             print(f"  Analyzing {len(quarter_comments_df)} comments...")
             
             # Prepare comments data for analysis
-            comments_text = ""
-            bank_count = 0
-            for _, row in quarter_comments_df.iterrows():
-                comments_text += f"\n\n**{row['TICKER']} ({row['SECTOR']}):**\n{row['COMMENT']}"
-                bank_count += 1
+            parts = [f"\n\n**{row.TICKER} ({row.SECTOR}):**\n{row.COMMENT}"
+                     for row in quarter_comments_df.itertuples(index=False)]
+            comments_text = "".join(parts)
+            bank_count = len(parts)
             
             # Create the analysis prompt
             prompt = f"""
@@ -130,7 +169,8 @@ class BulkQuarterlyAnalysisGenerator:
             - If insufficient data for a category, clearly state "Insufficient data available"
             """
 
-            # Send to OpenAI
+            # Send to OpenAI (waits for a free request slot)
+            self.rate_limiter.acquire()
             response = self.client.chat.completions.create(
                 model="gpt-4", 
                 messages=[
@@ -167,9 +207,17 @@ class BulkQuarterlyAnalysisGenerator:
             # Convert to DataFrame
             results_df = pd.DataFrame(analysis_results)
             
-            # Sort by quarter
-            results_df['quarter_sort'] = results_df['quarter'].apply(quarter_sort_key)
-            results_df = results_df.sort_values('quarter_sort').drop('quarter_sort', axis=1)
+            # Sort by quarter through an ordered categorical (the comments' quarter order,
+            # re-derived from the unique quarters when older results hold other quarters)
+            quarters = results_df['quarter'].unique().tolist()
+            quarter_order = self.quarter_order
+            if not set(quarters) <= set(quarter_order):
+                quarter_order = sort_quarters(quarters)
+            results_df = results_df.sort_values(
+                'quarter',
+                key=lambda q: pd.Categorical(q, categories=quarter_order, ordered=True),
+                kind='stable'
+            )
             
             # Save to Excel
             results_df.to_excel(self.analysis_file, index=False)
@@ -184,7 +232,7 @@ class BulkQuarterlyAnalysisGenerator:
         """Get list of available quarters from comments data"""
         try:
             if os.path.exists(self.comments_file):
-                comments_df = pd.read_excel(self.comments_file)
+                comments_df = load_table(self.comments_file, columns=['QUARTER'])
                 quarters = comments_df['QUARTER'].unique().tolist()
                 return sort_quarters(quarters, reverse=True)
             return []
@@ -314,10 +362,36 @@ class BulkQuarterlyAnalysisGenerator:
                 existing_quarters = set(existing_analysis['quarter'].tolist())
                 print(f"   Found {len(existing_quarters)} existing analysis results")
             
+            # Results checkpointed by an interrupted run count as existing too
+            checkpoint_results = []
+            if skip_existing:
+                checkpoint_results = self.load_checkpoint()
+                existing_quarters.update(r['quarter'] for r in checkpoint_results)
+                if checkpoint_results:
+                    print(f"   Resuming with {len(checkpoint_results)} checkpointed results")
+            elif os.path.exists(self.checkpoint_file):
+                os.remove(self.checkpoint_file)
+            
+            analysis_results = []
+            
+            # Add existing results if any
+            if not existing_analysis.empty:
+                for _, row in existing_analysis.iterrows():
+                    analysis_results.append({
+                        'quarter': row['quarter'],
+                        'analysis_text': row['analysis_text'],
+                        'bank_count': row['bank_count'],
+                        'generated_date': row['generated_date'],
+                        'status': row['status']
+                    })
+            analysis_results.extend(checkpoint_results)
+            
             # Filter quarters that need analysis
             quarters_needing_analysis = [q for q in quarters_to_analyze if q not in existing_quarters]
             
             if not quarters_needing_analysis:
+                if checkpoint_results and self.save_analysis_results(analysis_results):
+                    os.remove(self.checkpoint_file)
                 print("✅ All quarters already have analysis results!")
                 return True
             
@@ -332,46 +406,38 @@ class BulkQuarterlyAnalysisGenerator:
             print("\n🤖 Starting AI analysis generation...")
             print("-" * 30)
             
-            analysis_results = []
-            
-            # Add existing results if any
-            if not existing_analysis.empty:
-                for _, row in existing_analysis.iterrows():
-                    analysis_results.append({
-                        'quarter': row['quarter'],
-                        'analysis_text': row['analysis_text'],
-                        'bank_count': row['bank_count'],
-                        'generated_date': row['generated_date'],
-                        'status': row['status']
-                    })
-            
-            # Analyze each quarter
-            for i, quarter in enumerate(quarters_needing_analysis, 1):
-                print(f"\n📋 Processing {quarter} ({i}/{len(quarters_needing_analysis)})")
-                
-                # Get comments for this quarter
-                quarter_comments = comments_df[comments_df['QUARTER'] == quarter]
-                
-                if quarter_comments.empty:
-                    print(f"  ⚠️  No comments found for {quarter}")
-                    continue
-                
-                # Generate analysis
-                result = self.analyze_quarter(quarter_comments, quarter)
-                analysis_results.append(result)
-                
-                if result['status'] == 'success':
-                    print(f"  ✅ Analysis completed for {quarter}")
-                else:
-                    print(f"  ❌ Analysis failed for {quarter}")
-                
-                # Save progress after each quarter
-                self.save_analysis_results(analysis_results)
+            # Analyze quarters concurrently; the OpenAI calls are network-bound and
+            # analyze_quarter throttles them through the shared rate limiter
+            with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+                futures = {}
+                for quarter in quarters_needing_analysis:
+                    # Get comments for this quarter
+                    quarter_comments = comments_df[comments_df['QUARTER'] == quarter]
+                    
+                    if quarter_comments.empty:
+                        print(f"  ⚠️  No comments found for {quarter}")
+                        continue
+                    
+                    print(f"📋 Queued {quarter}")
+                    futures[executor.submit(self.analyze_quarter, quarter_comments, quarter)] = quarter
                 
-                # Add delay to avoid rate limiting
-                if i < len(quarters_needing_analysis):
-                    print(f"  ⏱️  Waiting 2 seconds before next quarter...")
-                    time.sleep(2)
+                # Results are collected (and checkpointed) on this thread as they finish
+                for i, future in enumerate(as_completed(futures), 1):
+                    quarter = futures[future]
+                    result = future.result()
+                    analysis_results.append(result)
+                    
+                    if result['status'] == 'success':
+                        print(f"  ✅ Analysis completed for {quarter} ({i}/{len(futures)})")
+                    else:
+                        print(f"  ❌ Analysis failed for {quarter} ({i}/{len(futures)})")
+                    
+                    # Checkpoint progress after each quarter (one line, not a full Excel rewrite)
+                    self.append_checkpoint(result)
+            
+            # Write the Excel file once; the checkpoint is only needed until then
+            if self.save_analysis_results(analysis_results) and os.path.exists(self.checkpoint_file):
+                os.remove(self.checkpoint_file)
             
             print("\n" + "=" * 50)
             print("🎉 Bulk analysis generation completed!")
@@ -10,20 +10,22 @@ sys.path.append(project_root)
 
 # Import from utilities
 from utilities.plot_chart import Bankplot
+from utilities.data_loader import load_table, concat_tables
 
 # Load your data (same as main file)
-@st.cache_data(ttl=3600)  # Refresh cache every hour
+# No st.cache_data here: load_table already caches the frames (see streamlit_app.py)
 def load_data():
-    df_quarter = pd.read_csv(os.path.join(project_root, 'Data/dfsectorquarter.csv'))
-    df_year = pd.read_csv(os.path.join(project_root, 'Data/dfsectoryear.csv'))
+    # Parsed once per process and shared with the other pages (Parquet copy when available)
+    df_quarter = load_table(os.path.join(project_root, 'Data/dfsectorquarter.csv'))
+    df_year = load_table(os.path.join(project_root, 'Data/dfsectoryear.csv'))
     
     # Load forecast data if it exists
     forecast_path = os.path.join(project_root, 'Data/dfsectorforecast.csv')
     df_forecast = None
     if os.path.exists(forecast_path):
-        df_forecast = pd.read_csv(forecast_path)
+        df_forecast = load_table(forecast_path)
     
-    keyitem = pd.read_excel(os.path.join(project_root, 'Data/Key_items.xlsx'))
+    keyitem = load_table(os.path.join(project_root, 'Data/Key_items.xlsx'))
     return df_quarter, df_year, df_forecast, keyitem
 
 df_quarter, df_year, df_forecast, keyitem = load_data()
@@ -68,35 +70,29 @@ include_forecast = st.sidebar.checkbox(
 )
 
 # Process data based on selections
+# df_quarter/df_year are shared cached frames: read them, never assign into them
 if db_option == "Quarterly":
-    df = df_quarter.copy()
+    df = df_quarter
     
     # If forecast is included and available, append yearly forecast to quarterly data
     if include_forecast and df_forecast is not None:
         # For quarterly view, append yearly forecast data directly
         # The forecast data will show as years (2025, 2026) after quarters
-        # Rename Year column to Date_Quarter for consistency
-        df_forecast_quarterly = df_forecast.copy()
-        df_forecast_quarterly['Date_Quarter'] = df_forecast_quarterly['Year'].astype(str)
-        
-        # Add is_forecast flag
-        df['is_forecast'] = False
-        df_forecast_quarterly['is_forecast'] = True
+        # Copy Year into Date_Quarter for consistency and flag the rows as forecast
+        df_forecast_quarterly = df_forecast.assign(Date_Quarter=df_forecast['Year'].astype(str),
+                                                   is_forecast=True)
         
         # Combine the dataframes
-        df = pd.concat([df, df_forecast_quarterly], ignore_index=True)
+        df = concat_tables([df.assign(is_forecast=False), df_forecast_quarterly])
 else:
-    df = df_year.copy()
+    df = df_year
     
     if include_forecast and df_forecast is not None:
         # For yearly view, combine historical and forecast
-        df['is_forecast'] = False
-        df_forecast['is_forecast'] = True
-        df = pd.concat([df, df_forecast], ignore_index=True)
+        df = concat_tables([df.assign(is_forecast=False), df_forecast.assign(is_forecast=True)])
     else:
         # Filter out any forecast years if not including forecast
-        df = df[df['Year'] <= last_historical_year]
-        df['is_forecast'] = False
+        df = df[df['Year'] <= last_historical_year].assign(is_forecast=False)
 
 # Make the data available globally for the Bankplot function
 st.session_state.df = df
@@ -112,4 +108,4 @@ if include_forecast:
     st.info("📊 Forecast data (2025-2026) is shown with dotted lines")
 
 # Call the banking plot function
-Bankplot(df, keyitem)
\ No newline at end of file
+Bankplot(df, keyitem, db_key=(db_option, include_forecast))
\ No newline at end of file
@@ -11,21 +11,24 @@ sys.path.append(project_root)
 
 # Import from utilities
 from utilities.banking_table import Banking_table
+from utilities.plot_chart import get_x_options
 from utilities.stock_candle import Stock_price_plot
+from utilities.data_loader import load_table, concat_tables
 
 # Load your data (same as main file)
-@st.cache_data(ttl=3600)  # Refresh cache every hour
+# No st.cache_data here: load_table already caches the frames (see streamlit_app.py)
 def load_data():
-    df_quarter = pd.read_csv(os.path.join(project_root, 'Data/dfsectorquarter.csv'))
-    df_year = pd.read_csv(os.path.join(project_root, 'Data/dfsectoryear.csv'))
+    # Parsed once per process and shared with the other pages (Parquet copy when available)
+    df_quarter = load_table(os.path.join(project_root, 'Data/dfsectorquarter.csv'))
+    df_year = load_table(os.path.join(project_root, 'Data/dfsectoryear.csv'))
     
     # Load forecast data if it exists
     forecast_path = os.path.join(project_root, 'Data/dfsectorforecast.csv')
     df_forecast = None
     if os.path.exists(forecast_path):
-        df_forecast = pd.read_csv(forecast_path)
+        df_forecast = load_table(forecast_path)
     
-    keyitem = pd.read_excel(os.path.join(project_root, 'Data/Key_items.xlsx'))
+    keyitem = load_table(os.path.join(project_root, 'Data/Key_items.xlsx'))
     return df_quarter, df_year, df_forecast, keyitem
 
 df_quarter, df_year, df_forecast, keyitem = load_data()
@@ -70,61 +73,58 @@ include_forecast = st.sidebar.checkbox(
 )
 
 # Process data based on selections
+# df_quarter/df_year are shared cached frames: read them, never assign into them
 if db_option == "Quarterly":
-    df = df_quarter.copy()
+    df = df_quarter
     
     # If forecast is included and available, append yearly forecast to quarterly data
     if include_forecast and df_forecast is not None:
         # For quarterly view, append yearly forecast data directly
-        # Rename Year column to Date_Quarter for consistency
-        df_forecast_quarterly = df_forecast.copy()
-        df_forecast_quarterly['Date_Quarter'] = df_forecast_quarterly['Year'].astype(str)
-        
-        # Add is_forecast flag
-        df['is_forecast'] = False
-        df_forecast_quarterly['is_forecast'] = True
+        # Copy Year into Date_Quarter for consistency and flag the rows as forecast
+        df_forecast_quarterly = df_forecast.assign(Date_Quarter=df_forecast['Year'].astype(str),
+                                                   is_forecast=True)
         
         # Combine the dataframes
-        df = pd.concat([df, df_forecast_quarterly], ignore_index=True)
+        df = concat_tables([df.assign(is_forecast=False), df_forecast_quarterly])
 else:
-    df = df_year.copy()
+    df = df_year
     
     if include_forecast and df_forecast is not None:
         # For yearly view, combine historical and forecast
-        df['is_forecast'] = False
-        df_forecast['is_forecast'] = True
-        df = pd.concat([df, df_forecast], ignore_index=True)
+        df = concat_tables([df.assign(is_forecast=False), df_forecast.assign(is_forecast=True)])
     else:
         # Filter out any forecast years if not including forecast
-        df = df[df['Year'] <= last_historical_year]
-        df['is_forecast'] = False
+        df = df[df['Year'] <= last_historical_year].assign(is_forecast=False)
 
 # Conditional format function
 def conditional_format(df):
-    def human_format(num):
-        try:
-            num = float(num)
-        except:
-            return ""
-        abs_num = abs(num)
-        if abs_num >= 1_000_000_000:
-            return f"{num/1_000_000_000:,.0f}"
-        else:
-            return f"{num:.1f}"
+    # Numeric view of the whole table, converted once (non-numeric cells become NaN)
+    values = df.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+    missing = np.isnan(values)
+    has_numeric = ~missing.all(axis=1)
     
-    def format_row(row):
-        vals = pd.to_numeric(row, errors='coerce').values  # Ensures a NumPy array
-        numeric_vals = vals[~np.isnan(vals)]
-        if len(numeric_vals) == 0:
-            return pd.Series([str(v) if v is not None else "" for v in row], index=row.index)
-        median_val = np.median(np.abs(numeric_vals))
-        if median_val > 100:
-            return pd.Series([human_format(v) if pd.notnull(v) and v != '' else "" for v in row], index=row.index)
-        else:
-            return pd.Series(["{:.2f}%".format(float(v)*100) if pd.notnull(v) and v != '' else "" for v in row], index=row.index)
-    # Apply formatting row-wise, axis=1
-    formatted = df.apply(format_row, axis=1)
-    return formatted
+    # Rows whose median |value| exceeds 100 are amounts (billions / one decimal), the rest percentages
+    row_median = np.full(len(df), np.nan)
+    if has_numeric.any():
+        row_median[has_numeric] = np.nanmedian(np.abs(values[has_numeric]), axis=1)
+    amount_cell = np.broadcast_to((row_median > 100)[:, None], values.shape)
+    billions_cell = np.abs(values) >= 1_000_000_000
+    
+    cells = [
+        "" if miss
+        else (f"{v/1_000_000_000:,.0f}" if billions else f"{v:.1f}") if amount
+        else f"{v*100:.2f}%"
+        for v, miss, amount, billions in zip(values.ravel(), missing.ravel(),
+                                             amount_cell.ravel(), billions_cell.ravel())
+    ]
+    cells = np.array(cells, dtype=object).reshape(values.shape)
+    
+    # Rows without any numeric value are shown as text
+    if not has_numeric.all():
+        raw = df.to_numpy(dtype=object)
+        for i in np.flatnonzero(~has_numeric):
+            cells[i] = [str(v) if v is not None else "" for v in raw[i]]
+    return pd.DataFrame(cells, index=df.index, columns=df.columns)
 
 # Set session state variables for the imported functions
 st.session_state.df = df
@@ -141,9 +141,7 @@ if include_forecast:
     st.info("Forecast data (2025-2026) is included in the table")
 
 # --- Define User Selection Options ---
-bank_type = ['Sector', 'SOCB', 'Private_1', 'Private_2', 'Private_3']
-tickers = sorted([x for x in df['TICKER'].unique() if isinstance(x, str) and len(x) == 3])
-x_options = bank_type + tickers
+bank_type, tickers, x_options = get_x_options((db_option, include_forecast), df)
 
 col1, col2 = st.columns(2)
 with col1:
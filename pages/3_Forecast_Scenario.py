@@ -8,6 +8,8 @@ import os
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(project_root)
 
+from utilities.data_loader import load_table, concat_tables
+
 # Page configuration
 st.set_page_config(
     page_title="Forecast Scenario Analysis",
@@ -49,17 +51,18 @@ st.title(' ')
 @st.cache_data(ttl=3600)  # Refresh cache every hour
 def load_data():
     """Load all required data in one optimized function"""
-    df_year = pd.read_csv(os.path.join(project_root, 'Data/dfsectoryear.csv'))
+    # Parsed once per process and shared with the other pages (Parquet copy when available)
+    df_year = load_table(os.path.join(project_root, 'Data/dfsectoryear.csv'))
     
     # Load forecast data if it exists and combine with historical
     forecast_file = os.path.join(project_root, 'Data/dfsectorforecast.csv')
     if os.path.exists(forecast_file):
-        df_forecast = pd.read_csv(forecast_file)
-        # Combine historical and forecast data
-        df_year = pd.concat([df_year, df_forecast], ignore_index=True)
+        df_forecast = load_table(forecast_file)
+        # Combine historical and forecast data (keeping TICKER/Type categorical)
+        df_year = concat_tables([df_year, df_forecast])
     
-    df_quarter = pd.read_csv(os.path.join(project_root, 'Data/dfsectorquarter.csv'))
-    keyitem = pd.read_excel(os.path.join(project_root, 'Data/Key_items.xlsx'))
+    df_quarter = load_table(os.path.join(project_root, 'Data/dfsectorquarter.csv'))
+    keyitem = load_table(os.path.join(project_root, 'Data/Key_items.xlsx'))
     
     # Dynamically determine forecast years from data
     # Get years from actual bank data (3-letter tickers only)
@@ -78,8 +81,10 @@ def load_data():
         forecast_year_1 = last_complete_year + 1 if last_complete_year else None
         forecast_year_2 = last_complete_year + 2 if last_complete_year else None
     
-    # Pre-process quarter data
-    df_quarter['Year'] = 2000 + df_quarter['Date_Quarter'].str.extract(r'Q(\d+)', expand=False).astype(int)
+    # Pre-process quarter data (assign returns a new frame; the loaded one is shared)
+    df_quarter = df_quarter.assign(
+        Year=2000 + df_quarter['Date_Quarter'].str.extract(r'Q(\d+)', expand=False).astype(int)
+    )
     
     return df_year, df_quarter, keyitem, last_complete_year, forecast_year_1, forecast_year_2
 
@@ -12,17 +12,19 @@ sys.path.append(project_root)
 # Import utilities
 from utilities.quarter_utils import quarter_sort_key, sort_quarters
 from utilities.openai_comments import openai_comment
+from utilities.data_loader import load_table
 
 # Load environment variables
 load_dotenv()
 
 # Load your data (same as main file)
-@st.cache_data(ttl=3600)  # Refresh cache every hour
+# No st.cache_data here: load_table already caches the frames (see streamlit_app.py)
 def load_data():
-    df_quarter = pd.read_csv(os.path.join(project_root, 'Data/dfsectorquarter.csv'))
-    df_year = pd.read_csv(os.path.join(project_root, 'Data/dfsectoryear.csv'))
-    keyitem = pd.read_excel(os.path.join(project_root, 'Data/Key_items.xlsx'))
-    bank_type = pd.read_excel(os.path.join(project_root, 'Data/Bank_Type.xlsx'))
+    # Parsed once per process and shared with the other pages (Parquet copy when available)
+    df_quarter = load_table(os.path.join(project_root, 'Data/dfsectorquarter.csv'))
+    df_year = load_table(os.path.join(project_root, 'Data/dfsectoryear.csv'))
+    keyitem = load_table(os.path.join(project_root, 'Data/Key_items.xlsx'))
+    bank_type = load_table(os.path.join(project_root, 'Data/Bank_Type.xlsx'))
     return df_quarter, df_year, keyitem, bank_type
 
 df_quarter, df_year, keyitem, bank_type_mapping = load_data()
@@ -177,7 +177,8 @@ Instructions:
                     user_question=user_question,
                     client=client,
                     latest_quarter=st.session_state.query_router.latest_quarter,
-                    latest_4_quarters=st.session_state.query_router._get_latest_4_quarters()
+                    latest_4_quarters=st.session_state.query_router._get_latest_4_quarters(),
+                    known_tickers=st.session_state.qualitative_handler.get_known_tickers()
                 )
             
             with st.spinner("Duc is gathering insights..."):
@@ -18,6 +18,10 @@ sys.path.append(project_root)
 
 # Import utilities
 from utilities.quarter_utils import quarter_to_numeric
+from utilities.data_loader import load_table
+
+# Columns of banking_comments.xlsx used on this page
+COMMENT_COLUMNS = ['TICKER', 'SECTOR', 'QUARTER', 'COMMENT', 'GENERATED_DATE']
 
 # Define path functions
 def get_data_path():
@@ -47,7 +51,7 @@ def show_comment_management():
         
         if comments_exist:
             try:
-                comments_df = pd.read_excel(comments_file)
+                comments_df = load_table(comments_file, columns=COMMENT_COLUMNS)
                 
                 # Display summary statistics
                 col1, col2, col3, col4 = st.columns(4)
@@ -58,11 +62,9 @@ def show_comment_management():
                 with col3:
                     st.metric("Unique Quarters", comments_df['QUARTER'].nunique())
                 with col4:
-                    # Convert GENERATED_DATE to datetime for finding the latest
+                    # Convert GENERATED_DATE to datetime for finding the latest (no frame copy needed)
                     if not comments_df.empty:
-                        comments_df_temp = comments_df.copy()
-                        comments_df_temp['GENERATED_DATE'] = pd.to_datetime(comments_df_temp['GENERATED_DATE'])
-                        latest_date = comments_df_temp['GENERATED_DATE'].max().strftime('%Y-%m-%d')
+                        latest_date = pd.to_datetime(comments_df['GENERATED_DATE']).max().strftime('%Y-%m-%d')
                     else:
                         latest_date = "N/A"
                     st.metric("Latest Update", latest_date)
@@ -141,7 +143,15 @@ def show_comment_management():
         
         if comments_exist:
             try:
-                comments_df = pd.read_excel(comments_file)
+                comments_df = load_table(comments_file, columns=COMMENT_COLUMNS)
+                
+                # One counting pass per column; unique counts and coverage are derived from these
+                ticker_counts = comments_df['TICKER'].value_counts()
+                ticker_counts = ticker_counts[ticker_counts > 0]
+                quarter_counts = comments_df['QUARTER'].value_counts()
+                quarter_counts = quarter_counts[quarter_counts > 0]
+                sector_counts = comments_df['SECTOR'].value_counts()
+                sector_counts = sector_counts[sector_counts > 0]
                 
                 # Overall statistics
                 st.subheader("Overall Statistics")
@@ -150,29 +160,25 @@ def show_comment_management():
                 with col1:
                     st.metric("Total Comments", len(comments_df))
                 with col2:
-                    st.metric("Unique Banks", comments_df['TICKER'].nunique())
+                    st.metric("Unique Banks", len(ticker_counts))
                 with col3:
-                    st.metric("Unique Quarters", comments_df['QUARTER'].nunique())
+                    st.metric("Unique Quarters", len(quarter_counts))
                 with col4:
                     avg_length = comments_df['COMMENT'].str.len().mean()
                     st.metric("Avg Comment Length", f"{avg_length:.0f} chars")
                 
                 # Comments by sector
                 st.subheader("Comments by Sector")
-                sector_counts = comments_df['SECTOR'].value_counts()
                 st.bar_chart(sector_counts)
                 
                 # Comments by quarter
                 st.subheader("Comments by Quarter")
-                quarter_counts = comments_df['QUARTER'].value_counts()
                 st.bar_chart(quarter_counts)
                 
-                # Timeline
+                # Timeline (dates parsed once, without copying the frame)
                 st.subheader("Generation Timeline")
-                comments_df_timeline = comments_df.copy()
-                comments_df_timeline['GENERATED_DATE'] = pd.to_datetime(comments_df_timeline['GENERATED_DATE'])
-                comments_df_timeline['Generation_Day'] = comments_df_timeline['GENERATED_DATE'].dt.date
-                daily_counts = comments_df_timeline['Generation_Day'].value_counts().sort_index()
+                generation_day = pd.to_datetime(comments_df['GENERATED_DATE'], cache=True).dt.date
+                daily_counts = generation_day.value_counts().sort_index()
                 st.line_chart(daily_counts)
                 
                 # Missing data analysis
@@ -180,17 +186,17 @@ def show_comment_management():
                 
                 # Load original data to check coverage
                 data_path = get_data_path()
-                df_quarter = pd.read_csv(os.path.join(data_path, "dfsectorquarter.csv"))
+                df_quarter = load_table(os.path.join(data_path, "dfsectorquarter.csv"), columns=['TICKER', 'Date_Quarter'])
                 all_banks = df_quarter[df_quarter['TICKER'].str.len() == 3]['TICKER'].unique()
                 all_quarters = df_quarter['Date_Quarter'].unique()
                 
                 coverage_data = []
                 for bank in all_banks:
-                    bank_comments = comments_df[comments_df['TICKER'] == bank]
+                    bank_comment_count = int(ticker_counts.get(bank, 0))
                     coverage_data.append({
                         'Bank': bank,
-                        'Comments': len(bank_comments),
-                        'Coverage': f"{len(bank_comments)}/{len(all_quarters)}"
+                        'Comments': bank_comment_count,
+                        'Coverage': f"{bank_comment_count}/{len(all_quarters)}"
                     })
                 
                 coverage_df = pd.DataFrame(coverage_data)
@@ -207,7 +213,7 @@ def show_comment_management():
         
         if comments_exist:
             try:
-                comments_df = pd.read_excel(comments_file)
+                comments_df = load_table(comments_file, columns=COMMENT_COLUMNS)
                 
                 # Get available quarters (newest first)
                 from utilities.quarter_utils import sort_quarters
@@ -244,7 +250,9 @@ def show_comment_management():
                         st.metric("Avg Comment Length", f"{avg_length:.0f} chars")
                     
                     # Show sector breakdown
+                    # SECTOR is categorical, so sectors without comments this quarter count as 0
                     sector_breakdown = quarter_comments['SECTOR'].value_counts()
+                    sector_breakdown = sector_breakdown[sector_breakdown > 0]
                     st.write("**Sector Breakdown:**")
                     st.write(sector_breakdown.to_dict())
                     
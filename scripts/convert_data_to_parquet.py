@@ -0,0 +1,43 @@
+#%%
+"""
+Convert Data Files to Parquet
+Builds the Parquet copies the app reads in place of the CSV/Excel sources,
+so the first page load after a data refresh does not have to parse them.
+Run after prepare_data.py / prepare_valuation.py; copies older than their
+source are rebuilt automatically on the next load anyway.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# Get project directories
+script_dir = Path(__file__).parent
+project_root = script_dir.parent
+data_dir = project_root / 'Data'
+sys.path.append(str(project_root))
+
+from utilities.data_loader import load_table
+
+# Sources read through utilities.data_loader by the app pages and the valuation formatter
+TABLE_FILES = [
+    'dfsectorquarter.csv',
+    'dfsectoryear.csv',
+    'dfsectorforecast.csv',
+    'Key_items.xlsx',
+    'Bank_Type.xlsx',
+    'banking_comments.xlsx',
+    'Valuation_banking.csv',
+]
+
+#%% Convert
+for file_name in TABLE_FILES:
+    path = data_dir / file_name
+    if not path.exists():
+        print(f"Skipping {file_name} (not found)")
+        continue
+    start = time.time()
+    df = load_table(str(path))
+    print(f"{file_name}: {len(df)} rows -> {path.with_suffix('.parquet').name} ({time.time() - start:.2f}s)")
+
+print("Done")
@@ -10,6 +10,7 @@ import os
 from dotenv import load_dotenv
 import requests
 from datetime import datetime
+from utilities.data_loader import load_table
 
 # Page configuration
 st.set_page_config(
@@ -23,11 +24,13 @@ st.set_page_config(
 load_dotenv()
 
 # Load your data
-@st.cache_data(ttl=3600)  # Refresh cache every hour
+# Not wrapped in st.cache_data: that would unpickle a copy of every frame on each rerun,
+# while load_table already returns the shared frames (reloaded when a file changes)
 def load_data():
-    df_quarter = pd.read_csv('Data/dfsectorquarter.csv')
-    df_year = pd.read_csv('Data/dfsectoryear.csv')
-    keyitem = pd.read_excel('Data/Key_items.xlsx')
+    # Parsed once per process and shared with the pages (Parquet copy when available)
+    df_quarter = load_table('Data/dfsectorquarter.csv')
+    df_year = load_table('Data/dfsectoryear.csv')
+    keyitem = load_table('Data/Key_items.xlsx')
     return df_quarter, df_year, keyitem
 
 df_quarter, df_year, keyitem = load_data()
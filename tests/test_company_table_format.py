@@ -0,0 +1,34 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+PAGE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                    'pages', '2_Company_Table.py')
+
+
+def load_conditional_format():
+    """Pull conditional_format out of the page without running the Streamlit script"""
+    with open(PAGE, encoding='utf-8') as f:
+        source = f.read()
+    start = source.index('def conditional_format')
+    end = source.index('\n# Set session state', start)
+    namespace = {'pd': pd, 'np': np}
+    exec(source[start:end], namespace)
+    return namespace['conditional_format']
+
+
+conditional_format = load_conditional_format()
+
+
+def test_amount_and_percentage_rows():
+    df = pd.DataFrame({'1Q25': [1.5e12, 0.05], '2Q25': [2.0e12, 0.07]}, index=['Loans', 'NIM'])
+    formatted = conditional_format(df)
+    assert formatted.loc['Loans'].tolist() == ['1,500', '2,000']
+    assert formatted.loc['NIM'].tolist() == ['5.00%', '7.00%']
+
+
+def test_single_column_table_keeps_text_rows():
+    df = pd.DataFrame({'1Q25': [1.5e12, None, 0.05]}, dtype=object)
+    formatted = conditional_format(df)
+    assert formatted['1Q25'].tolist() == ['1,500', '', '5.00%']
@@ -0,0 +1,58 @@
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from AI_MPC.qualitative_query_parser import parse_qualitative_query, _parse_with_regex
+
+KNOWN_TICKERS = {'ACB', 'VCB', 'TCB', 'Sector', 'SOCB', 'Private_1', 'Private_2', 'Private_3'}
+MODEL_ANSWER = {'tickers': ['ACB'], 'timeframe': ['2025-Q2'], 'has_sectors': False,
+                'valuation': True, 'need_components': False}
+
+
+class FakeClient:
+    """Stands in for the OpenAI client and counts parse calls"""
+
+    def __init__(self):
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, **kwargs):
+        self.calls += 1
+        message = SimpleNamespace(content=json.dumps(MODEL_ANSWER))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def test_simple_bank_question_is_parsed_locally():
+    client = FakeClient()
+    parsed = parse_qualitative_query("What happened at ACB and VCB in 2Q25?", client,
+                                     '2025-Q2', [], known_tickers=KNOWN_TICKERS)
+    assert client.calls == 0
+    assert parsed == {'tickers': ['ACB', 'VCB'], 'timeframe': ['2025-Q2'], 'has_sectors': False,
+                      'valuation': False, 'need_components': False}
+
+
+@pytest.mark.parametrize('question', [
+    "How do ACB key metrics look in 2Q25?",            # "metrics" is a valuation term
+    "Is ACB cheap on multiples in 2Q25?",              # valuation wording
+    "Top performers in SOCB for 2Q25",                 # needs sector member data
+    "How did SOCB do in 2Q25?",                        # any sector ticker goes to the model
+    "Which one is better, ACB or TCB, in 2Q25?",
+    "ACB outlook for 1H25 and 2Q25",                   # 1H25 is not a quarter
+    "ACB results in FY24 and 4Q24",
+    "ACB results in Q2 2025",
+    "ACB results in 2024",
+])
+def test_questions_needing_the_model_are_not_parsed_locally(question):
+    assert _parse_with_regex(question, KNOWN_TICKERS) is None
+
+
+def test_model_is_used_when_regex_declines():
+    client = FakeClient()
+    parsed = parse_qualitative_query("Is ACB cheap on multiples in 2Q25?", client,
+                                     '2025-Q2', [], known_tickers=KNOWN_TICKERS)
+    assert client.calls == 1
+    assert parsed['valuation'] is True
@@ -13,6 +13,7 @@ from functools import wraps
 from scipy import stats
 import requests
 from datetime import datetime, timedelta
+from .data_loader import load_table
 
 
 class BankingToolSystem:
@@ -45,9 +46,9 @@ class BankingToolSystem:
             self.data['historical_quarter'] = pd.read_csv(self.data_dir / 'dfsectorquarter.csv')
             self.data['forecast'] = pd.read_csv(self.data_dir / 'dfsectorforecast.csv')
             
-            # Load reference data
-            self.data['bank_types'] = pd.read_excel(self.data_dir / 'Bank_Type.xlsx')
-            self.data['key_items'] = pd.read_excel(self.data_dir / 'Key_items.xlsx')
+            # Load reference data (static sheets, shared cached frames: read-only)
+            self.data['bank_types'] = load_table(str(self.data_dir / 'Bank_Type.xlsx'))
+            self.data['key_items'] = load_table(str(self.data_dir / 'Key_items.xlsx'))
             
             # Load AI-generated content
             if (self.data_dir / 'banking_comments.xlsx').exists():
@@ -5,6 +5,7 @@ Banking analysis utility functions - Simplified with vectorized operations
 
 import pandas as pd
 import numpy as np
+from .data_loader import keycode_maps
 
 #%% Main banking table creation function
 
@@ -36,12 +37,10 @@ def create_banking_table(ticker_or_type, num_periods, growth_type, df=None, keyi
     ratio_metrics = ['NIM', 'Loan yield', 'NPL', 'NPL Formation (%)', 
                      'GROUP 2', 'G2 Formation (%)', 'NPL Coverage ratio', 'Provision/ Total Loan']
     
-    # Get KeyCode mappings
-    earnings_df = pd.DataFrame({'Name': earnings_metrics})
-    ratios_df = pd.DataFrame({'Name': ratio_metrics})
-    
-    earnings_codes = earnings_df.merge(keyitem, on='Name', how='left')
-    ratios_codes = ratios_df.merge(keyitem, on='Name', how='left')
+    # Get KeyCode mappings (Series of KeyCodes indexed by Name)
+    name_to_keycode, _ = keycode_maps(keyitem)
+    earnings_codes = name_to_keycode.reindex(earnings_metrics)
+    ratios_codes = name_to_keycode.reindex(ratio_metrics)
     
     # Filter data based on ticker or type
     bank_types = ['Sector', 'SOCB', 'Private_1', 'Private_2', 'Private_3']
@@ -78,11 +77,11 @@ def process_table_data(df_data, metrics_codes, growth_type, num_periods, include
     Using vectorized pandas operations
     """
     # Select columns
-    cols_to_keep = ['Date_Quarter'] + metrics_codes['KeyCode'].tolist()
+    cols_to_keep = ['Date_Quarter'] + metrics_codes.tolist()
     df_table = df_data[cols_to_keep].copy()
     
     # Rename columns to friendly names
-    rename_dict = dict(zip(metrics_codes['KeyCode'], metrics_codes['Name']))
+    rename_dict = dict(zip(metrics_codes.values, metrics_codes.index))
     df_table.columns = ['Date_Quarter'] + [rename_dict.get(col, col) for col in df_table.columns[1:]]
     
     if include_growth:
@@ -102,7 +101,7 @@ def process_table_data(df_data, metrics_codes, growth_type, num_periods, include
         
         # Reorder columns: Date_Quarter, then alternating metric and growth
         col_order = ['Date_Quarter']
-        for i, name in enumerate(metrics_codes['Name'].tolist()):
+        for i, name in enumerate(metrics_codes.index):
             col_order.append(name)
             if i < growth_cols:
                 col_order.append(f"{name} {growth_type} (%)")
@@ -1,6 +1,13 @@
 import pandas as pd
 import numpy as np
-from .quarter_utils import sort_quarters, format_quarter_for_display
+from .quarter_utils import quarters_to_numeric, format_quarter_for_display
+
+# Rows of the two tables (columns already have descriptive names, so no keyitem lookup)
+EARNINGS_COLUMNS = ['Loan', 'TOI', 'Provision expense', 'PBT', 'ROA', 'ROE']
+RATIO_COLUMNS = [
+    'NIM', 'Loan yield', 'NPL', 'NPL Formation (%)', 'GROUP 2', 'G2 Formation (%)',
+    'NPL Coverage ratio', 'Provision/ Total Loan'
+]
 
 def Banking_table(X, Y, Z, df=None, keyitem=None):
     # Use global variables if not provided as parameters
@@ -26,24 +33,6 @@ def Banking_table(X, Y, Z, df=None, keyitem=None):
     else:
         raise ValueError("DataFrame must have either 'Date_Quarter' or 'Year' column")
 
-    # --- Prepare List of Columns to Keep ---
-    cols_keep_table1 = pd.DataFrame({
-        'Name': [
-            'Loan', 'TOI', 'Provision expense', 'PBT', 'ROA', 'ROE'
-        ]
-    })
-    
-    cols_keep_table2 = pd.DataFrame({
-        'Name': [
-            'NIM', 'Loan yield', 'NPL', 'NPL Formation (%)', 'GROUP 2', 'G2 Formation (%)',
-            'NPL Coverage ratio', 'Provision/ Total Loan'
-        ]
-    })
-    
-    # No need to merge with keyitem since columns already have descriptive names
-    cols_keep_final_table1 = [date_column] + cols_keep_table1['Name'].tolist()
-    cols_keep_final_table2 = [date_column] + cols_keep_table2['Name'].tolist()
-
     # --- Filter Data for Table ---
     bank_type = ['Sector', 'SOCB', 'Private_1', 'Private_2', 'Private_3']
     if X in bank_type:
@@ -54,17 +43,13 @@ def Banking_table(X, Y, Z, df=None, keyitem=None):
         df_temp = df[df['TICKER'] == X]
 
     # --- Calculate Growth Tables ---
-    def get_growth_table(df_, period, suffix, cols_names):
-        """Calculate growth (%) and return formatted DataFrame."""
-        cols_keep_final = [date_column] + cols_names['Name'].tolist()
-        df_filtered = df_[cols_keep_final]
-        growth = df_filtered.iloc[:, 1:].pct_change(periods=period, fill_method=None)
-        growth = growth.add_suffix(f' {suffix} (%)')
-        return pd.concat([df_filtered[date_column], growth], axis=1)
+    def get_growth_table(values, period, suffix):
+        """Calculate growth (%) of the metric columns in values, suffixed for display."""
+        growth = values.pct_change(periods=period, fill_method=None)
+        return growth.add_suffix(f' {suffix} (%)')
 
-    def get_ytd_growth_table(df_, cols_names):
+    def get_ytd_growth_table(df_, cols_keep_final):
         """Calculate YTD growth (%) from current quarter to Q4 of previous year."""
-        cols_keep_final = [date_column] + cols_names['Name'].tolist()
         df_filtered = df_[cols_keep_final].copy()
         
         if is_quarterly:
@@ -81,29 +66,20 @@ def Banking_table(X, Y, Z, df=None, keyitem=None):
         ytd_growth = pd.DataFrame(index=df_filtered.index)
         ytd_growth[date_column] = df_filtered[date_column]
         
-        for col in cols_names['Name']:
-            ytd_growth[f'{col} YTD (%)'] = np.nan
-            
-            for i in range(len(df_filtered)):
-                current_year = df_filtered.iloc[i]['Year']
-                current_value = df_filtered.iloc[i][col]
-                
-                # Find Q4 of previous year
-                prev_year_q4 = df_filtered[
-                    (df_filtered['Year'] == current_year - 1) & 
-                    (df_filtered['Quarter'] == 4)
-                ]
-                
-                if not prev_year_q4.empty and pd.notnull(current_value):
-                    prev_q4_value = prev_year_q4.iloc[0][col]
-                    if pd.notnull(prev_q4_value) and prev_q4_value != 0:
-                        ytd_growth.iloc[i, ytd_growth.columns.get_loc(f'{col} YTD (%)')] = \
-                            (current_value - prev_q4_value) / prev_q4_value
+        # First Q4 row of each year, looked up by year instead of masking per row
+        q4_by_year = df_filtered[df_filtered['Quarter'] == 4].drop_duplicates('Year').set_index('Year')
+        prev_year = df_filtered['Year'] - 1
+        
+        for col in cols_keep_final[1:]:
+            current_value = df_filtered[col]
+            prev_q4_value = prev_year.map(q4_by_year[col])
+            valid = current_value.notna() & prev_q4_value.notna() & (prev_q4_value != 0)
+            ytd_growth[f'{col} YTD (%)'] = ((current_value - prev_q4_value) / prev_q4_value).where(valid)
         
         return ytd_growth[[date_column] + [col for col in ytd_growth.columns if 'YTD (%)' in col]]
 
     def create_table(cols_names, table_name):
-        cols_keep_final = [date_column] + cols_names['Name'].tolist()
+        cols_keep_final = [date_column] + cols_names
         df_temp_table = df_temp[cols_keep_final]
         
         # --- Remove Date_Quarter column (columns already have friendly names) ---
@@ -111,49 +87,42 @@ def Banking_table(X, Y, Z, df=None, keyitem=None):
 
         # --- Only add growth columns for table 1 (Earnings metrics) ---
         if table_name == "Earnings metrics":
-            if is_quarterly:
-                QoQ_change = get_growth_table(df_temp, 1, 'QoQ', cols_names)
-                YoY_change = get_growth_table(df_temp, 4, 'YoY', cols_names)
+            # --- Growth Based on User Choice (QoQ or YoY), computed only for the one shown ---
+            if Z == 'QoQ' and is_quarterly:
+                suffix, period = 'QoQ', 1
+            elif is_quarterly:
+                suffix, period = 'YoY', 4
             else:
                 # For yearly data, YoY is comparing with previous year (period=1)
-                YoY_change = get_growth_table(df_temp, 1, 'YoY', cols_names)
+                suffix, period = 'YoY', 1
             
-            # --- Combine Data Based on User Choice (QoQ or YoY) ---
-            if Z == 'QoQ' and is_quarterly:
-                df_out = pd.concat([df_temp[[date_column]], df_temp_table, QoQ_change.iloc[:, 1:]], axis=1)
-                # Create column order dynamically
-                col_order = [date_column]
-                for i, name in enumerate(cols_names['Name'].tolist()):
-                    col_order.append(name)
-                    if i < 4:  # Only first 4 get growth columns
-                        col_order.append(f"{name} QoQ (%)")
-            else:
-                # For yearly data or when YoY is selected
-                df_out = pd.concat([df_temp[[date_column]], df_temp_table, YoY_change.iloc[:, 1:]], axis=1)
-                # Create column order dynamically
-                col_order = [date_column]
-                for i, name in enumerate(cols_names['Name'].tolist()):
-                    col_order.append(name)
-                    if i < 4:  # Only first 4 get growth columns
-                        col_order.append(f"{name} YoY (%)")
+            # Only the first 4 metrics get growth columns
+            growth = get_growth_table(df_temp_table.iloc[:, :4], period, suffix)
+            df_out = pd.concat([df_temp[[date_column]], df_temp_table, growth], axis=1)
+            
+            # Create column order dynamically
+            col_order = [date_column]
+            for i, name in enumerate(cols_names):
+                col_order.append(name)
+                if i < 4:
+                    col_order.append(f"{name} {suffix} (%)")
         else:
             # For table 2 (Ratios), don't add growth columns
             df_out = pd.concat([df_temp[[date_column]], df_temp_table], axis=1)
-            col_order = [date_column] + cols_names['Name'].tolist()
+            col_order = list(cols_keep_final)
 
-        # --- Reindex, Select Last Y Periods, Transpose for Display ---
-        df_out = df_out[col_order].tail(Y).T
-        df_out.columns = df_out.iloc[0]
-        df_out = df_out[1:]
+        # --- Reindex, Select Last Y Periods ---
+        df_out = df_out[col_order].tail(Y)
         
-        # Sort columns properly when forecast is included
+        # Sort periods properly when forecast is included (rows, before transposing)
         if include_forecast and 'is_forecast' in df_temp.columns:
-            # Get the original column order (dates)
-            date_cols = df_out.columns.tolist()
-            # Sort using our custom quarter sorting function
-            sorted_cols = sort_quarters(date_cols)
-            # Reorder the dataframe columns
-            df_out = df_out[sorted_cols]
+            period_keys = quarters_to_numeric(df_out[date_column])
+            df_out = df_out.iloc[np.argsort(period_keys, kind='stable')]
+        
+        # --- Transpose for Display ---
+        df_out = df_out.T
+        df_out.columns = df_out.iloc[0]
+        df_out = df_out[1:]
         
         # Format column names for display
         if is_quarterly:
@@ -168,8 +137,8 @@ def Banking_table(X, Y, Z, df=None, keyitem=None):
         return df_out
 
     # Create and display both tables
-    df_table1 = create_table(cols_keep_table1, "Earnings metrics")
-    df_table2 = create_table(cols_keep_table2, "Ratios")
+    df_table1 = create_table(EARNINGS_COLUMNS, "Earnings metrics")
+    df_table2 = create_table(RATIO_COLUMNS, "Ratios")
     
     # Identify forecast columns if forecast is included
     forecast_columns = []
@@ -0,0 +1,83 @@
+import importlib.util
+import logging
+import os
+from functools import lru_cache
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Parquet copies need pyarrow; without it the source file is parsed once per process
+_HAS_PARQUET = importlib.util.find_spec('pyarrow') is not None
+
+# Rust-based Excel reader when installed, otherwise pandas' default (openpyxl)
+_EXCEL_ENGINE = 'calamine' if importlib.util.find_spec('python_calamine') is not None else None
+
+# Repeated string keys, stored as categories (as in the AI_MPC loaders)
+_CATEGORY_COLS = ('TICKER', 'Type', 'Date_Quarter', 'SECTOR', 'QUARTER')
+
+
+def _read_source(path, columns=None):
+    """Parse a CSV or Excel data file, optionally only some of its columns"""
+    if path.endswith(('.xlsx', '.xls')):
+        df = pd.read_excel(path, engine=_EXCEL_ENGINE, usecols=columns)
+    else:
+        df = pd.read_csv(path, usecols=columns)
+
+    return _as_categories(df)
+
+
+def _as_categories(df):
+    """Store the repeated string key columns of df as categories (in place)"""
+    for col in _CATEGORY_COLS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    return df
+
+
+@lru_cache(maxsize=8)
+def _load_table(path, mtime, columns=None):
+    """
+    Load a CSV or Excel data file once per process (keyed by path, modification time and columns)
+    Prefers a Parquet copy next to the source and writes one on first read
+    """
+    columns = list(columns) if columns else None
+    parquet_path = os.path.splitext(path)[0] + '.parquet'
+    if os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= mtime:
+        try:
+            return pd.read_parquet(parquet_path, columns=columns)
+        except Exception as e:
+            logger.warning(f"Error reading {parquet_path}, falling back to {path}: {e}")
+
+    if not _HAS_PARQUET:
+        # No Parquet copy to fill, so push the column selection down to the parser
+        return _read_source(path, columns)
+
+    # Parse the whole file once for the Parquet copy; later loads read only the needed columns
+    df = _read_source(path)
+    try:
+        df.to_parquet(parquet_path, compression='zstd')
+    except Exception as e:
+        logger.warning(f"Could not write Parquet copy {parquet_path}: {e}")
+    return df[columns] if columns else df
+
+
+def load_table(path, columns=None):
+    """Return the cached DataFrame for a data file; callers must not modify it in place"""
+    return _load_table(path, os.path.getmtime(path), tuple(columns) if columns else None)
+
+
+def keycode_maps(keyitem):
+    """Name -> KeyCode and KeyCode -> Name lookups for the Key_items table, as Series"""
+    name_to_keycode = pd.Series(keyitem['KeyCode'].values, index=keyitem['Name'])
+    keycode_to_name = pd.Series(keyitem['Name'].values, index=keyitem['KeyCode'])
+    return name_to_keycode, keycode_to_name
+
+
+def concat_tables(frames):
+    """
+    pd.concat(frames, ignore_index=True) for loaded tables
+    Categories that differ between the frames would turn the key columns back into strings,
+    so they are re-categorized on the combined frame
+    """
+    return _as_categories(pd.concat(frames, ignore_index=True))
@@ -4,6 +4,7 @@ import streamlit as st
 import openai
 import os
 from dotenv import load_dotenv
+from .data_loader import keycode_maps
 
 def load_cached_comment(ticker, quarter):
     """Load a previously generated comment from the cache file"""
@@ -90,22 +91,21 @@ def openai_comment(ticker, sector, df_quarter=None, keyitem=None, force_regenera
     
     # If no cached comment or force_regenerate is True, generate new comment
     def get_data(ticker, sector):
-        cols_keep = pd.DataFrame({
-        'Name': [
+        cols_keep = [
             'Loan', 'TOI', 'Provision expense', 'PBT', 'ROA', 'ROE', 'NIM', 'Loan yield',
             'NPL', 'NPL Formation (%)', 'GROUP 2', 'G2 Formation (%)',
             'NPL Coverage ratio'
         ]
-        })
-        cols_code_keep = cols_keep.merge(keyitem, on='Name', how='left')
-        cols_keep_final = ['Date_Quarter'] + cols_code_keep['KeyCode'].tolist()
-        rename_dict = dict(zip(cols_code_keep['KeyCode'], cols_code_keep['Name']))
+        # Hash lookups instead of merging the Key_items table on every call
+        name_to_keycode, keycode_to_name = keycode_maps(keyitem)
+        cols_keep_final = ['Date_Quarter'] + name_to_keycode.reindex(cols_keep).dropna().tolist()
+        rename_dict = keycode_to_name.to_dict()
 
         # Helper functions for growth calculations
         def calculate_growth(df_data, period, suffix):
             """Calculate growth (%) and return formatted DataFrame."""
             growth = df_data.iloc[:, 1:].pct_change(periods=period)
-            growth.columns = growth.columns.map(rename_dict)
+            growth = growth.rename(columns=rename_dict)
             growth = growth.add_suffix(f' {suffix} (%)')
             return pd.concat([df_data['Date_Quarter'], growth], axis=1)
 
@@ -188,7 +188,7 @@ def openai_comment(ticker, sector, df_quarter=None, keyitem=None, force_regenera
         df_ticker_out = df_ticker_out[1:]
         
         # Get sector data (filter out individual tickers - length = 3)
-        df_sector = df_quarter[(df_quarter['Type'] == sector) & (df_quarter['TICKER'].apply(lambda t: len(t) > 3))]
+        df_sector = df_quarter[(df_quarter['Type'] == sector) & (df_quarter['TICKER'].str.len() > 3)]
         if not df_sector.empty:
             # Take the first representative ticker for the sector
             sector_ticker = df_sector['TICKER'].iloc[0]
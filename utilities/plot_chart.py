@@ -1,11 +1,43 @@
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
 import plotly.express as px
 from plotly.subplots import make_subplots
 from .quarter_utils import sort_quarters, format_quarter_for_display
 
-def Bankplot(df=None, keyitem=None):
+BANK_TYPES = ['Sector', 'SOCB', 'Private_1', 'Private_2', 'Private_3']
+
+def _build_x_options(df):
+    # Three-letter bank tickers; lengths measured with one vectorized pass over the distinct values
+    ticker_values = pd.Series(df['TICKER'].unique())
+    tickers = sorted(ticker_values[ticker_values.str.len() == 3])
+    return BANK_TYPES, tickers, BANK_TYPES + tickers
+
+def _data_key(db_key, df):
+    """Cache key for a dataset: db_key plus the frame's length and columns,
+    so a reloaded or edited source is not served the previous results."""
+    return (db_key, len(df), tuple(df.columns))
+
+@st.cache_data(ttl=3600)  # Refresh cache every hour
+def _cached_x_options(data_key, _df):
+    return _build_x_options(_df)
+
+@st.cache_data(ttl=3600)  # Refresh cache every hour
+def _cached_metric_medians(data_key, _df):
+    return _df.median(numeric_only=True).abs()
+
+def get_x_options(db_key, df):
+    """Return (bank_type, tickers, x_options) for the X selectors.
+
+    Cached per db_key (database choice and forecast flag) and the shape of df,
+    so the TICKER column is only scanned once per dataset rather than on every rerun.
+    """
+    return _cached_x_options(_data_key(db_key, df), df)
+
+def get_metric_medians(db_key, df):
+    """|median| of every numeric column (picks each subplot's tick format), cached like get_x_options."""
+    return _cached_metric_medians(_data_key(db_key, df), df)
+
+def Bankplot(df=None, keyitem=None, db_key=None):
     # Use global variables or session state if not provided as parameters
     if df is None:
         df = st.session_state.get('df')
@@ -27,9 +59,10 @@ def Bankplot(df=None, keyitem=None):
     color_sequence = px.colors.qualitative.Bold
 
     # Define your options
-    bank_type = ['Sector', 'SOCB', 'Private_1', 'Private_2', 'Private_3']
-    tickers = sorted([x for x in df['TICKER'].unique() if isinstance(x, str) and len(x) == 3])
-    x_options = bank_type + tickers
+    if db_key is not None:
+        bank_type, tickers, x_options = get_x_options(db_key, df)
+    else:
+        bank_type, tickers, x_options = _build_x_options(df)
     
     col1,col2,col3 = st.columns(3)
     with col1:
@@ -58,178 +91,110 @@ def Bankplot(df=None, keyitem=None):
     
     #Draw chart
     
+    # Traces are collected as plain dicts and added to the figure in one call;
+    # WebGL scatter keeps the browser responsive on the metric x ticker grid
+    traces, trace_rows, trace_cols = [], [], []
+    def add_scatter(row, col, **trace):
+        traces.append(dict(type='scattergl', **trace))
+        trace_rows.append(row)
+        trace_cols.append(col)
+    
+    # Latest Y rows of each selected ticker/type, grouped once instead of masking df per metric,
+    # together with their historical/forecast split when forecasts are shown
+    latest_rows = {}
+    for x, group in df[df['TICKER'].isin(X)].groupby('TICKER', sort=False, observed=True):
+        df_temp = group.tail(Y)
+        if include_forecast and 'is_forecast' in df_temp.columns:
+            latest_rows[x] = (df_temp,
+                              df_temp[df_temp['is_forecast'] == False],
+                              df_temp[df_temp['is_forecast'] == True])
+        else:
+            latest_rows[x] = (df_temp, None, None)
+    
+    # |median| of each metric, from one pass over the selected columns (or the cached set)
+    if db_key is not None:
+        medians = get_metric_medians(db_key, df)
+    else:
+        medians = df[Z].median().abs()
+    
+    # Y-axis tick format of each subplot (yaxis, yaxis2, ... in subplot order), applied with the layout
+    y_axes = {}
+    
     for idx, z_name in enumerate(Z):
         # Use the name directly since columns already have descriptive names
         value_col = z_name
-        metric_values=df[value_col].dropna()
-        median_value=metric_values.median()
-        median_value=abs(median_value)
+        median_value = medians[value_col]
         row = idx // 2 + 1
         col = idx % 2 + 1
         if median_value > 10:
             tick_format = ",.2s"  # SI units: k, M, B
         else:
             tick_format = ".2%"   # Percent
+        y_axes['yaxis' if idx == 0 else f'yaxis{idx + 1}'] = dict(tickformat=tick_format)
     
         for i, x in enumerate(X):
             show_legend = (idx == 0)
-            if len(x) == 3:  # Stock ticker
-                matched_rows = df[df['TICKER'] == x]
-                if not matched_rows.empty:
-                    df_temp = matched_rows.tail(Y)
-                    
-                    # Check if forecast data is included
-                    if include_forecast and 'is_forecast' in df_temp.columns:
-                        # Split into historical and forecast data
-                        df_historical = df_temp[df_temp['is_forecast'] == False]
-                        df_forecast = df_temp[df_temp['is_forecast'] == True]
-                        
-                        # Plot historical data with solid line
-                        if not df_historical.empty:
-                            fig.add_trace(
-                                go.Scatter(
-                                    x=df_historical[date_column],
-                                    y=df_historical[value_col],
-                                    mode='lines+markers',
-                                    name=str(x),
-                                    line=dict(color=color_sequence[i % len(color_sequence)], dash=None),
-                                    showlegend=show_legend
-                                ),
-                                row=row,
-                                col=col
-                            )
-                        
-                        # Plot forecast data with dotted line
-                        if not df_forecast.empty:
-                            # Connect last historical point to first forecast point
-                            if not df_historical.empty:
-                                # Create connecting trace
-                                last_hist = df_historical.iloc[-1]
-                                first_forecast = df_forecast.iloc[0]
-                                fig.add_trace(
-                                    go.Scatter(
-                                        x=[last_hist[date_column], first_forecast[date_column]],
-                                        y=[last_hist[value_col], first_forecast[value_col]],
-                                        mode='lines',
-                                        name=str(x) + ' (forecast)',
-                                        line=dict(color=color_sequence[i % len(color_sequence)], dash='dot'),
-                                        showlegend=False
-                                    ),
-                                    row=row,
-                                    col=col
-                                )
-                            
-                            # Plot forecast points
-                            fig.add_trace(
-                                go.Scatter(
-                                    x=df_forecast[date_column],
-                                    y=df_forecast[value_col],
-                                    mode='lines+markers',
-                                    name=str(x) + ' (forecast)',
-                                    line=dict(color=color_sequence[i % len(color_sequence)], dash='dot'),
-                                    marker=dict(symbol='circle-open'),
-                                    showlegend=show_legend
-                                ),
-                                row=row,
-                                col=col
-                            )
-                    else:
-                        # Normal plotting without forecast distinction
-                        fig.add_trace(
-                            go.Scatter(
-                                x=df_temp[date_column],
-                                y=df_temp[value_col],
-                                mode='lines+markers',
-                                name=str(x),
-                                line=dict(color=color_sequence[i % len(color_sequence)]),
-                                showlegend=show_legend
-                            ),
-                            row=row,
-                            col=col
+            # Stock tickers and bank types plot the same way (for aggregated
+            # bank types the TICKER column holds the bank type name)
+            if x not in latest_rows:
+                continue
+            df_temp, df_historical, df_forecast = latest_rows[x]
+            
+            # Check if forecast data is included
+            if df_historical is not None:
+                # Plot historical data with solid line
+                if not df_historical.empty:
+                    add_scatter(
+                        row, col,
+                        x=df_historical[date_column],
+                        y=df_historical[value_col],
+                        mode='lines+markers',
+                        name=str(x),
+                        line=dict(color=color_sequence[i % len(color_sequence)], dash=None),
+                        showlegend=show_legend
+                    )
+                
+                # Plot forecast data with dotted line
+                if not df_forecast.empty:
+                    # Connect last historical point to first forecast point
+                    if not df_historical.empty:
+                        # Create connecting trace
+                        last_hist = df_historical.iloc[-1]
+                        first_forecast = df_forecast.iloc[0]
+                        add_scatter(
+                            row, col,
+                            x=[last_hist[date_column], first_forecast[date_column]],
+                            y=[last_hist[value_col], first_forecast[value_col]],
+                            mode='lines',
+                            name=str(x) + ' (forecast)',
+                            line=dict(color=color_sequence[i % len(color_sequence)], dash='dot'),
+                            showlegend=False
                         )
-                        
-            else:  # Bank type
-                # For aggregated bank types, TICKER column contains the bank type name directly
-                matched_rows = df[df['TICKER'] == x]
-                if not matched_rows.empty:
-                    df_temp = matched_rows.tail(Y)
                     
-                    # Check if forecast data is included
-                    if include_forecast and 'is_forecast' in df_temp.columns:
-                        # Split into historical and forecast data
-                        df_historical = df_temp[df_temp['is_forecast'] == False]
-                        df_forecast = df_temp[df_temp['is_forecast'] == True]
-                        
-                        # Plot historical data with solid line
-                        if not df_historical.empty:
-                            fig.add_trace(
-                                go.Scatter(
-                                    x=df_historical[date_column],
-                                    y=df_historical[value_col],
-                                    mode='lines+markers',
-                                    name=str(x),
-                                    line=dict(color=color_sequence[i % len(color_sequence)], dash=None),
-                                    showlegend=show_legend
-                                ),
-                                row=row,
-                                col=col
-                            )
-                        
-                        # Plot forecast data with dotted line
-                        if not df_forecast.empty:
-                            # Connect last historical point to first forecast point
-                            if not df_historical.empty:
-                                # Create connecting trace
-                                last_hist = df_historical.iloc[-1]
-                                first_forecast = df_forecast.iloc[0]
-                                fig.add_trace(
-                                    go.Scatter(
-                                        x=[last_hist[date_column], first_forecast[date_column]],
-                                        y=[last_hist[value_col], first_forecast[value_col]],
-                                        mode='lines',
-                                        name=str(x) + ' (forecast)',
-                                        line=dict(color=color_sequence[i % len(color_sequence)], dash='dot'),
-                                        showlegend=False
-                                    ),
-                                    row=row,
-                                    col=col
-                                )
-                            
-                            # Plot forecast points
-                            fig.add_trace(
-                                go.Scatter(
-                                    x=df_forecast[date_column],
-                                    y=df_forecast[value_col],
-                                    mode='lines+markers',
-                                    name=str(x) + ' (forecast)',
-                                    line=dict(color=color_sequence[i % len(color_sequence)], dash='dot'),
-                                    marker=dict(symbol='circle-open'),
-                                    showlegend=show_legend
-                                ),
-                                row=row,
-                                col=col
-                            )
-                    else:
-                        # Normal plotting without forecast distinction
-                        fig.add_trace(
-                            go.Scatter(
-                                x=df_temp[date_column],
-                                y=df_temp[value_col],
-                                mode='lines+markers',
-                                name=str(x),
-                                line=dict(color=color_sequence[i % len(color_sequence)]),
-                                showlegend=show_legend
-                            ),
-                            row=row,
-                            col=col
-                        )
-  
-    fig.update_layout(
-        width=1400,
-        height=1200,
-        title_text=f"Banking Metrics: {', '.join(Z)}",
-        legend_title="Ticker/Type"
-    )
+                    # Plot forecast points
+                    add_scatter(
+                        row, col,
+                        x=df_forecast[date_column],
+                        y=df_forecast[value_col],
+                        mode='lines+markers',
+                        name=str(x) + ' (forecast)',
+                        line=dict(color=color_sequence[i % len(color_sequence)], dash='dot'),
+                        marker=dict(symbol='circle-open'),
+                        showlegend=show_legend
+                    )
+            else:
+                # Normal plotting without forecast distinction
+                add_scatter(
+                    row, col,
+                    x=df_temp[date_column],
+                    y=df_temp[value_col],
+                    mode='lines+markers',
+                    name=str(x),
+                    line=dict(color=color_sequence[i % len(color_sequence)]),
+                    showlegend=show_legend
+                )
+
+    fig.add_traces(traces, rows=trace_rows, cols=trace_cols)
     
     # Sort x axis - use custom sort to handle mixed quarters and forecast years
     # Fix: Use the dynamic date_column variable instead of hardcoded 'Date_Quarter'
@@ -238,14 +203,23 @@ def Bankplot(df=None, keyitem=None):
     # Create display labels in the format #Qyy
     display_labels = [format_quarter_for_display(date) for date in date_order]
     
-    # Update x-axes with sorted order and custom display labels
-    fig.update_xaxes(
+    # Sorted order and custom display labels for every x-axis of the grid (xaxis, xaxis2, ...),
+    # set in the same layout call as the y-axes instead of a separate update_xaxes pass
+    x_axis = dict(
         categoryorder='array', 
         categoryarray=date_order,
         ticktext=display_labels,
         tickvals=date_order
     )
-
-    for i in range(1, len(Z)+1):
-        fig.update_yaxes(tickformat=tick_format, row=(i-1)//2 + 1, col=(i-1)%2 + 1)    
-    st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
+    x_axes = {'xaxis' if n == 1 else f'xaxis{n}': x_axis for n in range(1, rows * cols + 1)}
+    
+    fig.update_layout(
+        width=1400,
+        height=1200,
+        title_text=f"Banking Metrics: {', '.join(Z)}",
+        legend_title="Ticker/Type",
+        **x_axes,
+        **y_axes
+    )
+    
+    st.plotly_chart(fig, use_container_width=True, config={'responsive': True})
\ No newline at end of file
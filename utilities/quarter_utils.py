@@ -1,5 +1,7 @@
 #%% Import libraries
 import re
+import numpy as np
+import pandas as pd
 
 def quarter_to_numeric(quarter_str):
     """Convert quarter string to numeric for sorting (e.g., '2024-Q1' -> 2024.00)
@@ -21,6 +23,22 @@ def quarter_to_numeric(quarter_str):
     except:
         return 0
 
+def quarters_to_numeric(quarter_list):
+    """Vectorized quarter_to_numeric for a list/Series of quarter strings (numpy float array)"""
+    labels = pd.Series(list(quarter_list), dtype=object).map(str)
+    
+    # YYYY-Q#: year + (quarter - 1) * 0.25
+    parts = labels.str.split('-Q')
+    year = pd.to_numeric(parts.str[0], errors='coerce')
+    quarter = pd.to_numeric(parts.str[1], errors='coerce')
+    keys = (year + (quarter - 1) * 0.25).where(labels.str.contains('-Q', regex=False))
+    
+    # Pure 4-digit years (forecast years) sort after their quarters
+    is_year = labels.str.isdigit() & (labels.str.len() == 4)
+    keys = keys.fillna((pd.to_numeric(labels.where(is_year), errors='coerce') + 0.99))
+    
+    return keys.fillna(0).to_numpy(dtype=float)
+
 def quarter_sort_key(quarter_str):
     """Sort key function for quarter strings
     With new format YYYY-Q#, alphabetical sort works naturally,
@@ -32,8 +50,14 @@ def sort_quarters(quarter_list, reverse=False):
     """Sort list of quarter strings chronologically
     With new format YYYY-Q#, simple alphabetical sort works,
     but we keep numeric sort for mixed year/quarter lists
+    Same order as sorted(quarter_list, key=quarter_sort_key, reverse=reverse), with the keys
+    computed in one vectorized pass
     """
-    return sorted(quarter_list, key=quarter_sort_key, reverse=reverse)
+    quarters = list(quarter_list)
+    keys = quarters_to_numeric(quarters)
+    # Stable like sorted(): ties keep their input order in both directions
+    order = np.argsort(-keys if reverse else keys, kind='stable')
+    return [quarters[i] for i in order]
 
 def format_quarter_for_display(quarter_str):
     """Convert quarter string from YYYY-Q# to #Qyy format for display only
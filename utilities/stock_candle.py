@@ -3,9 +3,23 @@ import streamlit as st
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
 from datetime import datetime, timedelta
 
+# Price columns are typed once on fetch (volume already parses as int64)
+PRICE_DTYPES = {'open': 'float32', 'high': 'float32', 'low': 'float32', 'close': 'float32'}
+
+# One pooled session for TCBS requests, so repeat fetches reuse the open TLS connection
+# (requests already asks for gzip/deflate encoded responses)
+_SESSION = requests.Session()
+_SESSION.headers.update({
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+    "Accept": "application/json"
+})
+_SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=10))
+
 def fetch_historical_price(ticker: str, days: int = 365) -> pd.DataFrame:
     """Fetch stock historical price and volume data from TCBS API"""
     
@@ -25,19 +39,17 @@ def fetch_historical_price(ticker: str, days: int = 365) -> pd.DataFrame:
         "to": str(to_timestamp)
     }
     
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-        "Accept": "application/json"
-    }
-    
     try:
-        response = requests.get(url, params=params, headers=headers, timeout=10)
+        response = _SESSION.get(url, params=params, timeout=10)
         response.raise_for_status()
         data = response.json()
         
         if 'data' in data and data['data']:
-            # Convert to DataFrame for easier manipulation
+            # Convert to DataFrame for easier manipulation, keeping only the relevant columns
+            columns_to_keep = ['tradingDate', 'open', 'high', 'low', 'close', 'volume']
             df = pd.DataFrame(data['data'])
+            df = df[[col for col in columns_to_keep if col in df.columns]]
+            df = df.astype({col: dtype for col, dtype in PRICE_DTYPES.items() if col in df.columns})
             
             # Convert timestamp to datetime
             if 'tradingDate' in df.columns:
@@ -47,10 +59,6 @@ def fetch_historical_price(ticker: str, days: int = 365) -> pd.DataFrame:
                 else:
                     df['tradingDate'] = pd.to_datetime(df['tradingDate'], unit='ms')
             
-            # Select relevant columns
-            columns_to_keep = ['tradingDate', 'open', 'high', 'low', 'close', 'volume']
-            df = df[[col for col in columns_to_keep if col in df.columns]]
-            
             # Remove any rows with null dates
             df = df.dropna(subset=['tradingDate'])
             
@@ -115,11 +123,8 @@ def Stock_price_plot(ticker: str):
             with st.expander("View missing data days"):
                 st.dataframe(missing_price_data[['tradingDate', 'open', 'high', 'low', 'close', 'volume']])
         
-        # Convert dates to strings for categorical x-axis (removes gaps)
-        df['date_str'] = df['tradingDate'].dt.strftime('%Y-%m-%d')
-        
-        # Use index for x-axis to ensure no gaps
-        df['x_index'] = range(len(df))
+        # Use the row position for x-axis to ensure no gaps
+        x_index = list(range(len(df)))
         
         # Calculate moving averages
         df['MA10'] = df['close'].rolling(window=10, min_periods=1).mean()
@@ -137,12 +142,13 @@ def Stock_price_plot(ticker: str):
         # Create tick text and values for showing dates at intervals
         tick_interval = max(1, len(df) // 20)  # Show about 20 ticks
         tickvals = list(range(0, len(df), tick_interval))
-        ticktext = [df.iloc[i]['date_str'] for i in tickvals]
+        # Only the labelled dates are formatted as strings
+        ticktext = df['tradingDate'].iloc[tickvals].dt.strftime('%Y-%m-%d').tolist()
         
         # Add candlestick chart using continuous index
         fig.add_trace(
             go.Candlestick(
-                x=df['x_index'].tolist(),  # Convert to list
+                x=x_index,
                 open=df['open'].tolist(),
                 high=df['high'].tolist(),
                 low=df['low'].tolist(),
@@ -157,7 +163,7 @@ def Stock_price_plot(ticker: str):
         # Add MA10 line (dashed)
         fig.add_trace(
             go.Scatter(
-                x=df['x_index'].tolist(),  # Convert to list
+                x=x_index,
                 y=df['MA10'].tolist(),
                 name='MA10',
                 line=dict(color='blue', width=1, dash='dash'),
@@ -170,7 +176,7 @@ def Stock_price_plot(ticker: str):
         # Add MA50 line (dashed)
         fig.add_trace(
             go.Scatter(
-                x=df['x_index'].tolist(),  # Convert to list
+                x=x_index,
                 y=df['MA50'].tolist(),
                 name='MA50',
                 line=dict(color='orange', width=1, dash='dash'),
@@ -181,12 +187,11 @@ def Stock_price_plot(ticker: str):
         )
         
         # Add volume bars
-        colors = ['red' if row['close'] < row['open'] else 'green' 
-                  for _, row in df.iterrows()]
+        colors = np.where(df['close'] < df['open'], 'red', 'green').tolist()
         
         fig.add_trace(
             go.Bar(
-                x=df['x_index'].tolist(),  # Convert to list
+                x=x_index,
                 y=df['volume'].tolist(),
                 name='Volume',
                 marker_color=colors,
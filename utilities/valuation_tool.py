@@ -52,10 +52,10 @@ def calculate_valuation_metrics(ticker_or_sector: str,
     # Filter data based on input type
     if ticker_or_sector in ['Private_1', 'Private_2', 'Private_3', 'SOCB', 'Sector']:
         # It's a sector - filter by Type column
-        filtered_df = df[df['Type'] == ticker_or_sector].copy()
+        filtered_df = df[df['Type'] == ticker_or_sector]
     else:
         # It's an individual ticker
-        filtered_df = df[df['TICKER'] == ticker_or_sector].copy()
+        filtered_df = df[df['TICKER'] == ticker_or_sector]
     
     if filtered_df.empty:
         return {'error': f'No data found for {ticker_or_sector}'}
@@ -124,7 +124,7 @@ def calculate_valuation_metrics(ticker_or_sector: str,
         
         if ticker_sector:
             # Get sector data
-            sector_df = df[df['Type'] == ticker_sector].copy()
+            sector_df = df[df['Type'] == ticker_sector]
             sector_df = sector_df.sort_values('TRADE_DATE')
             
             # Get sector's latest values
@@ -202,9 +202,9 @@ def get_valuation_statistics(ticker_or_sector: str,
     
     # Filter data
     if ticker_or_sector in ['Private_1', 'Private_2', 'Private_3', 'SOCB', 'Sector']:
-        filtered_df = df[df['Type'] == ticker_or_sector].copy()
+        filtered_df = df[df['Type'] == ticker_or_sector]
     else:
-        filtered_df = df[df['TICKER'] == ticker_or_sector].copy()
+        filtered_df = df[df['TICKER'] == ticker_or_sector]
     
     if filtered_df.empty:
         return {'error': f'No data found for {ticker_or_sector}'}
@@ -269,9 +269,9 @@ def calculate_valuation_metrics_batch(tickers: List[str],
     for ticker_or_sector in tickers:
         # Filter data based on input type
         if ticker_or_sector in ['Private_1', 'Private_2', 'Private_3', 'SOCB', 'Sector']:
-            filtered_df = df[df['Type'] == ticker_or_sector].copy()
+            filtered_df = df[df['Type'] == ticker_or_sector]
         else:
-            filtered_df = df[df['TICKER'] == ticker_or_sector].copy()
+            filtered_df = df[df['TICKER'] == ticker_or_sector]
         
         if filtered_df.empty:
             results[ticker_or_sector] = {'error': f'No data found for {ticker_or_sector}'}
@@ -340,7 +340,7 @@ def calculate_valuation_metrics_batch(tickers: List[str],
             
             if ticker_sector:
                 # Get sector data
-                sector_df = df[df['Type'] == ticker_sector].copy()
+                sector_df = df[df['Type'] == ticker_sector]
                 sector_df = sector_df.sort_values('TRADE_DATE')
                 
                 # Get sector's latest values